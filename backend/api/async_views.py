@@ -0,0 +1,90 @@
+"""
+Асинхронные представления чтения для запуска под ASGI.
+
+В Django 3.2 нет асинхронного ORM и кеша, а синхронные представления
+под ASGI выполняются по очереди в одном общем потоке. Асинхронное
+представление передаёт безопасные запросы (GET, HEAD, OPTIONS)
+синхронному представлению DRF в пул из API_ASYNC_THREADS потоков:
+запросы к базе и кешу разных клиентов выполняются параллельно, а цикл
+событий не ждёт базу. Размер пула ограничивает и число соединений
+процесса с базой. Изменяющие запросы выполняются как обычно.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+from rest_framework.permissions import SAFE_METHODS
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    """
+    Пул потоков представлений чтения, создаётся при первом вызове.
+
+    Пул создаётся под блокировкой: при одновременных первых запросах
+    лишние пулы с потоками не создаются.
+    """
+    global _executor
+    if _executor is not None:
+        return _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.API_ASYNC_THREADS,
+                thread_name_prefix='api-read',
+            )
+    return _executor
+
+
+def run_view(view, request, *args, **kwargs):
+    """
+    Выполнение синхронного представления в потоке пула.
+
+    Сигналы начала и конца запроса обрабатываются в общем потоке,
+    поэтому устаревшие соединения потока закрываются здесь.
+    """
+    close_old_connections()
+    try:
+        return view(request, *args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Асинхронная обёртка синхронного представления."""
+    write_view = sync_to_async(view, thread_sensitive=True)
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return await write_view(request, *args, **kwargs)
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor(),
+            partial(context.run, run_view, view, request, *args, **kwargs),
+        )
+
+    return async_view
+
+
+def async_read_urls(urlpatterns, names):
+    """Маршруты, в которых представления с именами names асинхронные."""
+    return [
+        URLPattern(
+            pattern.pattern,
+            async_read_view(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        if isinstance(pattern, URLPattern) and pattern.name in names
+        else pattern
+        for pattern in urlpatterns
+    ]
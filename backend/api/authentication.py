@@ -0,0 +1,169 @@
+"""
+Аутентификация по токену с кешем.
+
+TokenAuthentication в каждом запросе выбирает токен вместе
+с пользователем из базы. Здесь поля пользователя из USER_FIELDS ищутся
+сначала в ограниченном LRU-кеше процесса, где хранятся
+API_TOKEN_CACHE_LOCAL_TIMEOUT секунд, затем в общем кеше
+на API_TOKEN_CACHE_TIMEOUT секунд и только потом в базе. Пароль
+и остальные поля в кеш не попадают и при обращении загружаются из базы.
+Ключи кеша — хеши токенов, а не сами токены.
+
+Кеш токена сбрасывается сигналами после фиксации транзакции: при удалении
+токена, например, при выходе через djoser, и при изменении пользователя,
+в том числе деактивации. Сброс записывает новое поколение токена,
+а запись общего кеша действительна, только если её поколение совпадает
+с текущим. Поэтому запрос, прочитавший токен из базы до сброса,
+не вернёт удалённый токен в общий кеш. В кеше процесса токен действует
+не дольше API_TOKEN_CACHE_LOCAL_TIMEOUT секунд и после сброса в других
+процессах.
+"""
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+User = get_user_model()
+
+TOKEN_KEY = 'api:token:{}'
+GENERATION_KEY = 'api:token-generation:{}'
+
+# Поля пользователя, которые хранятся в кеше, в порядке полей модели:
+# в этом порядке их ожидает from_db.
+USER_FIELDS = (
+    'id', 'is_superuser', 'is_staff', 'is_active',
+    'email', 'username', 'first_name', 'last_name',
+)
+
+
+class LocalTokenCache:
+    """Кеш токенов в памяти процесса с ограничением размера и времени."""
+
+    def __init__(self):
+        """Пустой кеш."""
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """Поля пользователя из кеша или None."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, values = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return values
+
+    def set(self, key, values):
+        """Сохранение полей с вытеснением давно не использованных."""
+        size = settings.API_TOKEN_CACHE_SIZE
+        timeout = settings.API_TOKEN_CACHE_LOCAL_TIMEOUT
+        if not size or not timeout:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + timeout, values)
+            self._items.move_to_end(key)
+            while len(self._items) > size:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        """Удаление токена из кеша."""
+        with self._lock:
+            self._items.pop(key, None)
+
+
+local_tokens = LocalTokenCache()
+
+
+def get_token_hash(key):
+    """Хеш токена для ключей кеша."""
+    return sha256(key.encode()).hexdigest()
+
+
+def new_generation():
+    """Новое поколение токена, не совпадающее с прежними."""
+    return time.time_ns()
+
+
+def invalidate_token(key):
+    """Сброс кеша токена в процессе и в общем кеше."""
+    token_hash = get_token_hash(key)
+    cache.set(
+        GENERATION_KEY.format(token_hash), new_generation(),
+        settings.API_TOKEN_CACHE_TIMEOUT * 2,
+    )
+    cache.delete(TOKEN_KEY.format(token_hash))
+    local_tokens.delete(token_hash)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кешем токенов и пользователей."""
+
+    def authenticate_credentials(self, key):
+        """
+        Пользователь и токен по полям из кеша или из базы.
+
+        Объекты создаются заново в каждом запросе, поэтому запросы
+        не изменяют общие объекты.
+        """
+        token_hash = get_token_hash(key)
+        values = local_tokens.get(token_hash)
+        if values is None:
+            values = self.get_shared(token_hash, key)
+            local_tokens.set(token_hash, values)
+
+        user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, values)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        token = self.get_model().from_db(
+            DEFAULT_DB_ALIAS, ('key', 'user_id'), (key, user.pk)
+        )
+        token.user = user
+        return (user, token)
+
+    def get_shared(self, token_hash, key):
+        """
+        Поля пользователя из общего кеша или из базы.
+
+        Поколение читается до запроса к базе: если токен сброшен во время
+        запроса, запись в кеше получит прежнее поколение и не будет
+        использована.
+        """
+        token_key = TOKEN_KEY.format(token_hash)
+        generation_key = GENERATION_KEY.format(token_hash)
+        cached = cache.get_many((token_key, generation_key))
+        generation = cached.get(generation_key)
+        if generation is None:
+            cache.add(
+                generation_key, new_generation(),
+                settings.API_TOKEN_CACHE_TIMEOUT * 2,
+            )
+            generation = cache.get(generation_key)
+        entry = cached.get(token_key)
+        if entry is not None and entry[0] == generation:
+            return entry[1]
+
+        values = self.get_model().objects.filter(key=key).values_list(
+            *(f'user__{field}' for field in USER_FIELDS)
+        ).first()
+        if values is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if generation is not None:
+            cache.set(
+                token_key, (generation, values),
+                settings.API_TOKEN_CACHE_TIMEOUT,
+            )
+        return values
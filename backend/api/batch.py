@@ -0,0 +1,98 @@
+"""
+Пакетное добавление и удаление связей пользователя.
+
+Связи с рецептами (избранное, список покупок) и с авторами (подписки)
+изменяются для списка идентификаторов за постоянное число запросов:
+проверка объектов и существующих связей одним запросом, добавление
+через bulk_create, удаление одним DELETE ... IN. Для каждого
+идентификатора возвращается результат. Добавление через bulk_create
+не вызывает сигналов, поэтому кеш связей пользователя сбрасывается здесь.
+
+Счётчики изменяются только на действительно добавленные и удалённые
+связи. Если параллельный запрос пользователя добавил часть связей после
+проверки, вставка отменяется до точки сохранения, проверка повторяется
+и добавляются оставшиеся связи. Удаляемые связи блокируются при выборе,
+поэтому связь, удалённую параллельным запросом, второй раз не вычтут.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+
+from recipes.signals import bulk_loaded
+from .relations import invalidate_relations
+
+CREATED = 'created'
+EXISTS = 'exists'
+DELETED = 'deleted'
+NOT_FOUND = 'not_found'
+
+
+def find_targets(user, model, field, targets, ids):
+    """Объекты targets по ids и признак существующей связи с ними."""
+    return dict(
+        targets.filter(pk__in=ids).annotate(
+            linked=Exists(
+                model.objects.filter(user=user, **{field: OuterRef('pk')})
+            )
+        ).values_list('pk', 'linked')
+    )
+
+
+def add_relations(user, model, field, targets, ids, change_counter):
+    """
+    Добавление связей пользователя с объектами targets по ids.
+
+    Результат для идентификатора: created — связь добавлена,
+    exists — связь уже была, not_found — объекта нет среди targets.
+    """
+    found = find_targets(user, model, field, targets, ids)
+    created = [pk for pk, linked in found.items() if not linked]
+    while created:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [model(user=user, **{f'{field}_id': pk}) for pk in created]
+                )
+        except IntegrityError:
+            # Часть связей добавил параллельный запрос: проверка повторяется.
+            checked = find_targets(user, model, field, targets, ids)
+            remaining = [pk for pk, linked in checked.items() if not linked]
+            if set(remaining) == set(created):
+                raise
+            found, created = checked, remaining
+            continue
+        change_counter(created, 1)
+        bulk_loaded.send(sender=model)
+        transaction.on_commit(lambda: invalidate_relations(user.pk))
+        break
+    return [
+        {
+            'id': pk,
+            'status': (
+                NOT_FOUND if pk not in found
+                else EXISTS if found[pk] else CREATED
+            ),
+        }
+        for pk in ids
+    ]
+
+
+def delete_relations(user, model, field, ids, change_counter):
+    """
+    Удаление связей пользователя с объектами по ids.
+
+    Результат для идентификатора: deleted — связь удалена,
+    not_found — связи не было.
+    """
+    relations = model.objects.filter(
+        user=user, **{f'{field}__in': ids}
+    ).order_by()
+    deleted = set(
+        relations.select_for_update().values_list(field, flat=True)
+    )
+    if deleted:
+        relations.delete()
+        change_counter(deleted, -1)
+    return [
+        {'id': pk, 'status': DELETED if pk in deleted else NOT_FOUND}
+        for pk in ids
+    ]
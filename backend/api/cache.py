@@ -0,0 +1,136 @@
+"""
+Кеширование ответов API.
+
+У каждой модели, от которой зависят ответы, в кеше хранится версия —
+время её последнего изменения. Для кешей отдельных объектов так же
+хранятся версии объектов. Версии хранятся без срока и обновляются
+сигналами после фиксации транзакции. По версиям, адресу запроса,
+формату ответа и, при необходимости, пользователю вычисляется ETag:
+по нему отдаётся 304 Not Modified или данные ответа, сохранённые в кеше.
+Ответ, прочитанный из реплики вскоре после изменения, не кешируется
+и отдаётся без ETag.
+"""
+import time
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from .replicas import can_cache
+
+VERSION_KEY = 'api:version:{}'
+OBJECT_VERSION_KEY = 'api:version:{}:{}'
+RESPONSE_KEY = 'api:response:{}'
+
+# Версии хранятся без срока: новая версия после истечения срока изменила бы
+# ETag и ключи кеша без изменения данных. Истекают только сохранённые
+# ответы и представления.
+VERSION_TIMEOUT = None
+
+
+def get_key_versions(keys):
+    """Версии по ключам, отсутствующие в кеше начинаются с текущего времени."""
+    versions = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, VERSION_TIMEOUT)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def get_versions(models):
+    """Версии моделей."""
+    return get_key_versions(
+        [VERSION_KEY.format(model._meta.label_lower) for model in models]
+    )
+
+
+def bump_version(model):
+    """Обновление версии модели."""
+    cache.set(
+        VERSION_KEY.format(model._meta.label_lower),
+        time.time(),
+        VERSION_TIMEOUT,
+    )
+
+
+def object_version_key(model, pk):
+    """Ключ версии объекта модели."""
+    return OBJECT_VERSION_KEY.format(model._meta.label_lower, pk)
+
+
+def bump_object_version(model, pk):
+    """Обновление версии объекта модели."""
+    cache.set(object_version_key(model, pk), time.time(), VERSION_TIMEOUT)
+
+
+class CachedResponseMixin:
+    """
+    Кеширование ответов на просмотр списка и объекта.
+
+    В cache_models перечисляются модели, от которых зависит ответ,
+    в cache_actions — кешируемые действия. Если ответ зависит
+    от пользователя, указывается cache_per_user.
+    """
+
+    cache_models = ()
+    cache_actions = ('list', 'retrieve')
+    cache_per_user = False
+
+    def list(self, request, *args, **kwargs):
+        """Просмотр списка с кешированием."""
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Просмотр объекта с кешированием."""
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        """Условный ответ по ETag и Last-Modified или ответ из кеша."""
+        if self.action not in self.cache_actions:
+            return handler(request, *args, **kwargs)
+
+        versions = get_versions(self.cache_models)
+        user = request.user.pk if self.cache_per_user else None
+        etag = '"{}"'.format(md5(
+            f'{request.get_full_path()}|{request.accepted_renderer.format}|'
+            f'{user}|{versions}'.encode()
+        ).hexdigest())
+        last_modified = int(max(versions))
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            key = RESPONSE_KEY.format(etag)
+            data = cache.get(key)
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                if not can_cache(versions):
+                    return response
+                cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+            else:
+                response = Response(data)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        if self.cache_per_user:
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Authorization',))
+        else:
+            patch_cache_control(
+                response, public=True, max_age=settings.API_CACHE_MAX_AGE
+            )
+        patch_vary_headers(response, ('Accept',))
+        return response
@@ -0,0 +1,68 @@
+"""
+Лента рецептов авторов, на которых подписан пользователь.
+
+Лента собирается при чтении одним запросом: рецепты выбираются условием
+author_id IN (подзапрос подписок) в порядке убывания id, так что база
+обходит индексы (author, -id) или первичный ключ без сортировки всех
+рецептов авторов. Для пользователей, подписанных не меньше чем
+на RECIPES_FEED_HOT_FOLLOWS авторов, идентификаторы первых
+RECIPES_FEED_HEAD_SIZE рецептов ленты хранятся в кеше вместе с версиями
+рецептов и подписок, и первые страницы выбираются по первичному ключу.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Recipe
+from users.models import Subscription
+from .cache import get_versions
+from .relations import get_relations
+from .replicas import can_cache
+
+FEED_HEAD_KEY = 'api:feed:{}'
+FEED_MODELS = (Recipe, Subscription)
+
+
+def feed_recipes(user):
+    """Рецепты авторов, на которых подписан пользователь."""
+    return Recipe.objects.filter(
+        author__in=Subscription.objects.filter(user=user).values('author')
+    ).order_by('-id')
+
+
+def get_feed_head(request):
+    """
+    Идентификаторы начала ленты из кеша или None.
+
+    Начало ленты хранится только для пользователей с большим числом
+    подписок, для остальных запрос по индексу и так быстрый.
+    """
+    subscriptions = get_relations(request).subscriptions
+    if len(subscriptions) < settings.RECIPES_FEED_HOT_FOLLOWS:
+        return None
+    key = FEED_HEAD_KEY.format(request.user.pk)
+    versions = get_versions(FEED_MODELS)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+    head = list(feed_recipes(request.user).values_list(
+        'id', flat=True
+    )[:settings.RECIPES_FEED_HEAD_SIZE])
+    if can_cache(versions):
+        cache.set(key, (versions, head), settings.API_CACHE_TIMEOUT)
+    return head
+
+
+def get_feed(request, page_size, first_page):
+    """
+    Рецепты ленты для страницы.
+
+    Если страница вместе с признаком следующей страницы помещается
+    в начало ленты из кеша, рецепты выбираются по первичному ключу.
+    """
+    head = get_feed_head(request) if first_page else None
+    if head is None:
+        return feed_recipes(request.user)
+    complete = len(head) < settings.RECIPES_FEED_HEAD_SIZE
+    if not complete and page_size >= len(head):
+        return feed_recipes(request.user)
+    return Recipe.objects.filter(id__in=head).order_by('-id')
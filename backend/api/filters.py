@@ -4,9 +4,17 @@ from django_filters import (CharFilter, ChoiceFilter, FilterSet,
                             ModelChoiceFilter, ModelMultipleChoiceFilter)
 
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search_recipes
 
 User = get_user_model()
 
+RECIPE_ORDERINGS = {
+    'popular': ('-popularity', '-id'),
+    'trending': ('-trending', '-id'),
+    'newest': ('-id',),
+    'quickest': ('cooking_time', '-id'),
+}
+
 
 class IngredientFilter(FilterSet):
     """Фильтр ингредиента."""
@@ -41,6 +49,15 @@ class RecipeFilter(FilterSet):
         choices=(('0', '0'), ('1', '1')),
         method='is_in_shopping_cart_filter'
     )
+    ordering = ChoiceFilter(
+        label='Сортировка',
+        choices=[(ordering, ordering) for ordering in RECIPE_ORDERINGS],
+        method='ordering_filter'
+    )
+    search = CharFilter(
+        label='Поиск по названию, описанию и ингредиентам',
+        method='search_filter'
+    )
 
     class Meta:
         """Метаданные фильтра рецепта."""
@@ -63,3 +80,20 @@ class RecipeFilter(FilterSet):
         if value == '1' and not user.is_anonymous:
             return queryset.filter(shoppingcartrecipe__user=user)
         return queryset
+
+    def ordering_filter(self, queryset, name, value):
+        """Сортирует рецепты по популярности, новизне или времени."""
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
+    def search_filter(self, queryset, name, value):
+        """
+        Ищет рецепты по тексту.
+
+        Без явной сортировки найденные рецепты упорядочены
+        по релевантности, если она вычисляется.
+        """
+        queryset = search_recipes(queryset, value)
+        if 'search_rank' in queryset.query.annotations:
+            if not self.form.cleaned_data.get('ordering'):
+                return queryset.order_by('-search_rank', '-id')
+        return queryset
@@ -0,0 +1,73 @@
+"""
+Кеш представлений рецептов.
+
+Не зависящая от пользователя часть представления рецепта хранится
+в кеше по идентификатору рецепта и отметке: версии рецепта, которая
+обновляется при изменении рецепта и его ингредиентов, версии автора,
+версиям тегов и ингредиентов и адресу сайта для ссылок на изображения.
+Изменение одного рецепта или пользователя не сбрасывает представления
+остальных рецептов. Статусы избранного, списка покупок и подписки
+на автора подставляются при каждом ответе.
+"""
+from hashlib import md5
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from recipes.models import Ingredient, Recipe, Tag
+from .cache import VERSION_KEY, get_key_versions, object_version_key
+from .replicas import can_cache
+
+User = get_user_model()
+
+FRAGMENT_KEY = 'api:fragment:recipe:{}:{}'
+FRAGMENT_MODELS = (Tag, Ingredient)
+
+
+def get_fragments(recipes, request, serialize):
+    """
+    Представления рецептов из кеша.
+
+    Версии читаются, а отсутствующие в кеше представления сохраняются
+    одним вызовом. Представления, прочитанные из реплики вскоре после
+    изменения, не сохраняются.
+    """
+    model_keys = [
+        VERSION_KEY.format(model._meta.label_lower)
+        for model in FRAGMENT_MODELS
+    ]
+    object_keys = [
+        key
+        for recipe in recipes
+        for key in (
+            object_version_key(Recipe, recipe.pk),
+            object_version_key(User, recipe.author_id),
+        )
+    ]
+    versions = get_key_versions(model_keys + object_keys)
+    model_versions = versions[:len(model_keys)]
+    prefix = f'{request.build_absolute_uri("/")}|{model_versions}'
+
+    keys = []
+    recipe_versions = []
+    for index, recipe in enumerate(recipes):
+        own = versions[len(model_keys) + 2 * index:][:2]
+        recipe_versions.append(model_versions + own)
+        keys.append(FRAGMENT_KEY.format(
+            recipe.pk, md5(f'{prefix}|{own}'.encode()).hexdigest()
+        ))
+
+    cached = cache.get_many(keys)
+    fragments = []
+    missing = {}
+    for key, recipe, stamp in zip(keys, recipes, recipe_versions):
+        fragment = cached.get(key)
+        if fragment is None:
+            fragment = serialize(recipe)
+            if can_cache(stamp):
+                missing[key] = fragment
+        fragments.append(fragment)
+    if missing:
+        cache.set_many(missing, settings.API_CACHE_TIMEOUT)
+    return fragments
@@ -0,0 +1,86 @@
+"""
+Индекс ингредиентов для автодополнения по названию.
+
+Индекс хранится в памяти процесса в виде отсортированного списка
+названий в нижнем регистре. Он строится при первом обращении
+и перестраивается при изменении версии ингредиентов в кеше ответов,
+которую обновляют сигналы, в том числе из других процессов.
+"""
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from recipes.models import Ingredient
+from .cache import get_versions
+
+
+class IngredientIndex:
+    """Индекс ингредиентов по названию."""
+
+    def __init__(self):
+        """Пустой индекс, который построится при первом поиске."""
+        self._state = (None, None)
+
+    def _get_data(self):
+        """
+        Данные индекса, актуальные для текущей версии ингредиентов.
+
+        Индекс строится по основной базе: реплика может отставать
+        от версии.
+        """
+        version, = get_versions((Ingredient,))
+        built_version, data = self._state
+        if version == built_version:
+            return data
+
+        rows = Ingredient.objects.using(DEFAULT_DB_ALIAS).values_list(
+            'id', 'name', 'measurement_unit'
+        )
+        ingredients = sorted(
+            (name.casefold(), name, measurement_unit, pk)
+            for pk, name, measurement_unit in rows
+        )
+        data = (
+            [ingredient[0] for ingredient in ingredients],
+            [
+                {
+                    'id': pk,
+                    'name': name,
+                    'measurement_unit': measurement_unit,
+                }
+                for _, name, measurement_unit, pk in ingredients
+            ],
+        )
+        self._state = (version, data)
+        return data
+
+    def search(self, name, limit=None):
+        """
+        Поиск ингредиентов по названию.
+
+        Сначала идут ингредиенты, название которых начинается с искомой
+        строки, затем те, в названии которых она встречается.
+        """
+        keys, ingredients = self._get_data()
+        if limit is None:
+            limit = settings.INGREDIENTS_SEARCH_LIMIT
+        name = name.casefold()
+
+        found = []
+        index = bisect_left(keys, name)
+        while index < len(keys) and keys[index].startswith(name):
+            if len(found) >= limit:
+                return found
+            found.append(ingredients[index])
+            index += 1
+
+        for key, ingredient in zip(keys, ingredients):
+            if len(found) >= limit:
+                break
+            if name in key and not key.startswith(name):
+                found.append(ingredient)
+        return found
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,281 @@
+"""
+Замер времени ответа и количества запросов к базе для маршрутов API.
+
+Маршруты из api/urls.py, кроме создания рецепта (сохраняет файл
+изображения) и маршрутов djoser, отправляющих письма, вызываются несколько
+раз тестовым клиентом на текущих данных, например, созданных командой
+seed_benchmark.
+Каждый вызов выполняется в транзакции, которая затем откатывается,
+поэтому изменяющие запросы не меняют данные.
+С параметром --history результаты дописываются в файл в формате
+JSON Lines и сравниваются с предыдущим запуском.
+"""
+import json
+import time
+from statistics import median, quantiles
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from recipes.models import FavoriteRecipe, Ingredient, Recipe, Tag
+from users.models import Subscription
+
+User = get_user_model()
+
+PASSWORD = 'benchmark'
+BATCH_SIZE = 20
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'Замер времени ответа и количества запросов маршрутов API.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Количество вызовов каждого маршрута.',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым вызовом.',
+        )
+        parser.add_argument(
+            '--history',
+            help='Файл истории результатов в формате JSON Lines.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый относительный рост медианы времени ответа.',
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='Завершаться с ошибкой при ухудшении результатов.',
+        )
+
+    def handle(self, *args, **options):
+        """Код команды управления Джанго."""
+        results = {}
+        for name, method, url, data, user, setup in self.get_scenarios():
+            results[name] = self.measure(
+                method, url, data, user, setup,
+                options['repeat'], options['cold'],
+            )
+            self.stdout.write(
+                f'{name:<40} {results[name]["status"]:>4} '
+                f'{results[name]["queries"]:>4} запросов '
+                f'{results[name]["median"]:>9.2f} мс '
+                f'(p95 {results[name]["p95"]:.2f} мс)'
+            )
+        if options['history']:
+            regressions = self.compare(
+                options['history'], results, options['threshold']
+            )
+            with open(options['history'], 'a', encoding='utf-8') as file:
+                file.write(json.dumps(
+                    {'time': time.time(), 'results': results},
+                    ensure_ascii=False,
+                ) + '\n')
+            if regressions and options['fail_on_regression']:
+                raise CommandError(
+                    f'Ухудшились результаты: {", ".join(regressions)}'
+                )
+
+    def get_scenarios(self):
+        """
+        Сценарии вызова маршрутов.
+
+        Кортеж из названия, метода, адреса, данных запроса, пользователя
+        и функции подготовки данных, выполняемой перед вызовом.
+        """
+        user = User.objects.annotate(
+            favorites=Count('favoriterecipe')
+        ).order_by('-favorites').first()
+        recipe = Recipe.objects.order_by('-id').first()
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.first()
+        if None in (user, recipe, tag, ingredient):
+            raise CommandError('Заполните базу командой seed_benchmark.')
+        own_recipe = user.recipe.first() or recipe
+        author = User.objects.exclude(id=user.id).order_by(
+            '-recipes_count'
+        ).first()
+        recipe_url = reverse('api:recipe-detail', args=[recipe.id])
+        own_recipe_url = reverse('api:recipe-detail', args=[own_recipe.id])
+        favorite_url = reverse('api:recipe-favorite', args=[recipe.id])
+        cart_url = reverse('api:recipe-shopping_cart', args=[recipe.id])
+        subscribe_url = reverse('api:user-subscribe', args=[author.id])
+        recipe_list = reverse('api:recipe-list')
+
+        def delete_relations():
+            user.favoriterecipe.filter(recipe=recipe).delete()
+            user.shoppingcartrecipe.filter(recipe=recipe).delete()
+            user.subscriber.filter(author=author).delete()
+
+        def create_relations():
+            user.favoriterecipe.get_or_create(recipe=recipe)
+            user.shoppingcartrecipe.get_or_create(recipe=recipe)
+            Subscription.objects.get_or_create(user=user, author=author)
+
+        batch_ids = list(
+            Recipe.objects.values_list('id', flat=True)[:BATCH_SIZE]
+        )
+
+        def delete_batch_relations():
+            user.favoriterecipe.filter(recipe__in=batch_ids).delete()
+
+        def create_batch_relations():
+            FavoriteRecipe.objects.bulk_create(
+                [
+                    FavoriteRecipe(user=user, recipe_id=recipe_id)
+                    for recipe_id in batch_ids
+                ],
+                ignore_conflicts=True,
+            )
+
+        recipe_data = {
+            'tags': [tag.id],
+            'ingredients': [{'id': ingredient.id, 'amount': 10}],
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+        }
+        return (
+            ('tags', 'get', reverse('api:tag-list'), None, None, None),
+            ('tag', 'get', reverse('api:tag-detail', args=[tag.id]),
+             None, None, None),
+            ('ingredients', 'get', reverse('api:ingredient-list'),
+             None, None, None),
+            ('ingredients ?name=', 'get', reverse('api:ingredient-list'),
+             {'name': ingredient.name[:2]}, None, None),
+            ('ingredient', 'get',
+             reverse('api:ingredient-detail', args=[ingredient.id]),
+             None, None, None),
+            ('recipes anonymous', 'get', recipe_list, None, None, None),
+            ('recipes', 'get', recipe_list, None, user, None),
+            ('recipes ?limit=100', 'get', recipe_list,
+             {'limit': 100}, user, None),
+            ('recipes ?page=100', 'get', recipe_list,
+             {'page': 100}, user, None),
+            ('recipes ?pagination=cursor', 'get', recipe_list,
+             {'pagination': 'cursor'}, user, None),
+            ('recipes ?is_favorited=1', 'get', recipe_list,
+             {'is_favorited': 1}, user, None),
+            ('recipes ?tags=', 'get', recipe_list,
+             {'tags': tag.slug}, user, None),
+            ('recipes ?author=', 'get', recipe_list,
+             {'author': author.id}, user, None),
+            ('recipes ?search=', 'get', recipe_list,
+             {'search': ingredient.name.split()[0]}, user, None),
+            ('recipes match', 'get', reverse('api:recipe-match'),
+             {'ingredients': list(recipe.ingredients.values_list(
+                 'id', flat=True
+             )), 'max_missing': 1}, user, None),
+            ('recipe', 'get', recipe_url, None, user, None),
+            ('recipe update', 'patch', own_recipe_url, recipe_data,
+             own_recipe.author, None),
+            ('recipe delete', 'delete', own_recipe_url, None,
+             own_recipe.author, None),
+            ('favorite add', 'post', favorite_url, None, user,
+             delete_relations),
+            ('favorite delete', 'delete', favorite_url, None, user,
+             create_relations),
+            ('favorite batch add', 'post',
+             reverse('api:recipe-favorite_batch'),
+             {'ids': batch_ids}, user, delete_batch_relations),
+            ('favorite batch delete', 'delete',
+             reverse('api:recipe-favorite_batch'),
+             {'ids': batch_ids}, user, create_batch_relations),
+            ('shopping cart add', 'post', cart_url, None, user,
+             delete_relations),
+            ('shopping cart delete', 'delete', cart_url, None, user,
+             create_relations),
+            ('download shopping cart', 'get',
+             reverse('api:recipe-download_shopping_cart'),
+             None, user, create_relations),
+            ('users', 'get', reverse('api:user-list'), None, user, None),
+            ('user', 'get', reverse('api:user-detail', args=[author.id]),
+             None, user, None),
+            ('me', 'get', reverse('api:user-me'), None, user, None),
+            ('subscribe', 'post', subscribe_url, None, user,
+             delete_relations),
+            ('unsubscribe', 'delete', subscribe_url, None, user,
+             create_relations),
+            ('subscriptions', 'get', reverse('api:subscription-list'),
+             {'recipes_limit': 3}, user, create_relations),
+            ('token login', 'post', reverse('api:login'),
+             {'email': user.email, 'password': PASSWORD}, None, None),
+            ('token logout', 'post', reverse('api:logout'),
+             None, user, None),
+        )
+
+    def measure(self, method, url, data, user, setup, repeat, cold):
+        """Вызов маршрута repeat раз с откатом изменений."""
+        client = APIClient(SERVER_NAME='localhost')
+        if user is not None:
+            client.force_authenticate(user)
+        timings = []
+        for _ in range(repeat):
+            if cold:
+                cache.clear()
+            with transaction.atomic():
+                if setup is not None:
+                    setup()
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    if method == 'get':
+                        response = client.get(url, data)
+                    else:
+                        response = getattr(client, method)(
+                            url, data, format='json'
+                        )
+                    timings.append((time.perf_counter() - start) * 1000)
+                transaction.set_rollback(True)
+        return {
+            'status': response.status_code,
+            'queries': len(context.captured_queries),
+            'median': median(timings),
+            'p95': (quantiles(timings, n=20)[-1]
+                    if len(timings) > 1 else timings[0]),
+        }
+
+    def compare(self, history, results, threshold):
+        """Сравнение с последним запуском из файла истории."""
+        try:
+            with open(history, encoding='utf-8') as file:
+                lines = file.read().splitlines()
+        except FileNotFoundError:
+            return []
+        if not lines:
+            return []
+        previous = json.loads(lines[-1])['results']
+        regressions = []
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]
+            changes = []
+            if result['queries'] > before['queries']:
+                changes.append(
+                    f'запросов {before["queries"]} → {result["queries"]}'
+                )
+            if result['median'] > before['median'] * (1 + threshold):
+                changes.append(
+                    f'медиана {before["median"]:.2f} → '
+                    f'{result["median"]:.2f} мс'
+                )
+            if changes:
+                regressions.append(name)
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: {", ".join(changes)}'
+                ))
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('Ухудшений нет.'))
+        return regressions
@@ -0,0 +1,93 @@
+"""
+Замер накладных расходов на соединение с базой в запросе к API.
+
+Запрос к API имитируется сигналами request_started и request_finished,
+между которыми выполняется SELECT 1. Запросы повторяются с новым
+соединением на каждый запрос, с постоянным соединением без проверки
+и с проверкой и с пулом соединений. Для каждого способа выводятся медиана
+и 95-й перцентиль времени запроса и число открытых соединений.
+"""
+import time
+from statistics import median, quantiles
+
+from django.core.management import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from foodgram_backend.db.base import PooledConnectionMixin
+
+MODES = (
+    ('новое соединение', False, {
+        'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'POOL_SIZE': 0,
+    }),
+    ('постоянное соединение', False, {
+        'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False, 'POOL_SIZE': 0,
+    }),
+    ('постоянное с проверкой', True, {
+        'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True, 'POOL_SIZE': 0,
+    }),
+    ('пул с проверкой', True, {
+        'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True, 'POOL_SIZE': 1,
+    }),
+)
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'Замер накладных расходов на соединение с базой.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--repeat', type=int, default=200,
+            help='Количество запросов для каждого способа.',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Псевдоним базы данных.',
+        )
+
+    def handle(self, *args, repeat, database, **options):
+        """Код команды управления Джанго."""
+        connection = connections[database]
+        pooled = isinstance(connection, PooledConnectionMixin)
+        if not pooled:
+            self.stdout.write(self.style.WARNING(
+                'Проверка и пул соединений есть только в бэкенде '
+                'foodgram_backend.db.'
+            ))
+        original = {
+            key: connection.settings_dict.get(key)
+            for _, _, overrides in MODES for key in overrides
+        }
+        try:
+            for name, needs_pool_backend, overrides in MODES:
+                if needs_pool_backend and not pooled:
+                    continue
+                connection.close()
+                connection.settings_dict.update(overrides)
+                timings, opened = self.measure(connection, repeat)
+                p95 = (quantiles(timings, n=20)[-1]
+                       if len(timings) > 1 else timings[0])
+                self.stdout.write(
+                    f'{name:<25} {median(timings):>8.3f} мс '
+                    f'(p95 {p95:.3f} мс) {opened:>5} соединений'
+                )
+        finally:
+            connection.close()
+            connection.settings_dict.update(original)
+
+    def measure(self, connection, repeat):
+        """Время запросов и количество открытых соединений."""
+        timings = []
+        opened = set()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            opened.add(connection.connection)
+            request_finished.send(sender=self.__class__)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings, len(opened)
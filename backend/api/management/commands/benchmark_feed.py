@@ -0,0 +1,115 @@
+"""
+Замер времени ответа ленты подписок в зависимости от числа подписок.
+
+Для каждого числа подписок пользователь подписывается на столько
+авторов с рецептами, сколько есть в базе, но не больше указанного,
+и несколько раз запрашивает первую страницу ленты без кеша и с кешем,
+а также страницу, до которой дошёл по ссылкам next.
+Замер выполняется в транзакции, которая затем откатывается,
+поэтому подписки пользователя не меняются.
+"""
+import time
+from statistics import median, quantiles
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'Замер времени ответа ленты подписок.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            'follows', nargs='*', type=int, default=[10, 1000, 10000],
+            help='Количество подписок пользователя.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Количество запросов каждой страницы.',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=6,
+            help='Размер страницы.',
+        )
+        parser.add_argument(
+            '--depth', type=int, default=10,
+            help='Номер страницы для замера глубокой страницы.',
+        )
+
+    def handle(self, *args, follows, repeat, limit, depth, **options):
+        """Код команды управления Джанго."""
+        user = User.objects.order_by('id').first()
+        if user is None:
+            raise CommandError('Заполните базу командой seed_benchmark.')
+        authors = list(
+            User.objects.exclude(pk=user.pk).filter(
+                recipes_count__gt=0
+            ).order_by('-recipes_count').values_list('id', flat=True)
+        )
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        url = f'{reverse("api:recipe-feed")}?limit={limit}'
+        for count in follows:
+            with transaction.atomic():
+                Subscription.objects.filter(user=user).delete()
+                Subscription.objects.bulk_create(
+                    Subscription(user=user, author_id=author_id)
+                    for author_id in authors[:count]
+                )
+                cache.clear()
+                deep_url = self.follow(client, url, depth)
+                for name, page_url, cold in (
+                    ('первая страница', url, True),
+                    ('первая страница, кеш прогрет', url, False),
+                    (f'страница {depth}', deep_url, False),
+                ):
+                    self.stdout.write(self.format(
+                        min(count, len(authors)), name,
+                        *self.measure(client, page_url, repeat, cold)
+                    ))
+                transaction.set_rollback(True)
+            cache.clear()
+
+    def follow(self, client, url, depth):
+        """Адрес страницы depth, полученный по ссылкам next."""
+        for _ in range(depth - 1):
+            next_url = client.get(url).data['next']
+            if next_url is None:
+                break
+            url = next_url
+        return url
+
+    def measure(self, client, url, repeat, cold):
+        """Запросы страницы repeat раз."""
+        timings = []
+        for _ in range(repeat):
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: {response.status_code}')
+        return len(context.captured_queries), timings
+
+    def format(self, count, name, queries, timings):
+        """Строка результата замера."""
+        p95 = (quantiles(timings, n=20)[-1]
+               if len(timings) > 1 else timings[0])
+        return (
+            f'{count:>6} подписок  {name:<30} {queries:>3} запросов '
+            f'{median(timings):>9.2f} мс (p95 {p95:.2f} мс)'
+        )
@@ -0,0 +1,93 @@
+"""
+Сравнение поиска ингредиентов по индексу с запросами к базе.
+
+Для каждой строки поиска, как в параметре name списка ингредиентов,
+несколько раз замеряется время поиска по индексу в памяти процесса
+и двумя способами через ORM: istartswith, как в IngredientFilter,
+и тем же поиском, что у индекса, — сначала по началу названия, затем
+по подстроке. Отдельно выводится время построения индекса. Без строк
+в аргументах ищутся начала названия первого ингредиента и отсутствующая
+строка.
+"""
+import time
+from statistics import median, quantiles
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from recipes.models import Ingredient
+from ...ingredient_index import IngredientIndex
+
+FIELDS = ('id', 'name', 'measurement_unit')
+
+
+def search_prefix(name, limit):
+    """Поиск по началу названия, как в IngredientFilter."""
+    return list(
+        Ingredient.objects.filter(name__istartswith=name).order_by(
+            'name'
+        ).values(*FIELDS)[:limit]
+    )
+
+
+def search_substring(name, limit):
+    """Поиск по началу названия, затем по подстроке, как у индекса."""
+    found = search_prefix(name, limit)
+    if len(found) < limit:
+        found += Ingredient.objects.filter(name__icontains=name).exclude(
+            name__istartswith=name
+        ).order_by('name').values(*FIELDS)[:limit - len(found)]
+    return found
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'Сравнение поиска ингредиентов по индексу с запросами к базе.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            'names', nargs='*',
+            help='Строки поиска.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Количество повторов каждого поиска.',
+        )
+
+    def handle(self, *args, names, repeat, **options):
+        """Код команды управления Джанго."""
+        first = Ingredient.objects.order_by('id').values_list(
+            'name', flat=True
+        ).first()
+        if first is None:
+            raise CommandError(
+                'Загрузите ингредиенты командой load_ingredients.'
+            )
+        limit = settings.INGREDIENTS_SEARCH_LIMIT
+        index = IngredientIndex()
+        start = time.perf_counter()
+        index.search('', limit)
+        self.stdout.write(
+            f'Построение индекса '
+            f'{(time.perf_counter() - start) * 1000:.2f} мс'
+        )
+        methods = (
+            ('index', index.search),
+            ('istartswith', search_prefix),
+            ('icontains', search_substring),
+        )
+        for name in names or [first[:1], first[:3], first, 'ъъъ']:
+            for method, search in methods:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    found = search(name, limit)
+                    timings.append((time.perf_counter() - start) * 1000)
+                p95 = (quantiles(timings, n=20)[-1]
+                       if len(timings) > 1 else timings[0])
+                self.stdout.write(
+                    f'{name:<30} {method:<12} {len(found):>6} найдено '
+                    f'{median(timings):>9.3f} мс (p95 {p95:.3f} мс)'
+                )
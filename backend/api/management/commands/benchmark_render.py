@@ -0,0 +1,77 @@
+"""
+Сравнение рендереров JSON на представлениях рецептов.
+
+Рецепты из базы сериализуются RecipeSerializer так же, как в списке
+рецептов, затем данные несколько раз преобразуются в JSON стандартным
+JSONRenderer и FastJSONRenderer. Для каждого рендерера выводятся
+медиана времени, размер ответа и пиковый объём памяти, выделенной
+при преобразовании, по данным tracemalloc.
+"""
+import time
+import tracemalloc
+from statistics import median
+
+from django.core.management import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.models import Recipe
+from ...renderers import FastJSONRenderer, orjson
+from ...serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'Сравнение рендереров JSON на представлениях рецептов.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Количество рецептов в ответе.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Количество преобразований каждым рендерером.',
+        )
+
+    def handle(self, *args, recipes, repeat, **options):
+        """Код команды управления Джанго."""
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson не установлен, FastJSONRenderer использует '
+                'стандартный JSONRenderer.'
+            ))
+        request = Request(
+            APIRequestFactory(SERVER_NAME='localhost').get('/api/recipes/')
+        )
+        data = RecipeSerializer(
+            Recipe.objects.with_related()[:recipes],
+            many=True,
+            context={'request': request},
+        ).data
+        if not data:
+            raise CommandError('Заполните базу командой seed_benchmark.')
+
+        results = {}
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                content = renderer.render(data)
+                timings.append((time.perf_counter() - start) * 1000)
+            tracemalloc.start()
+            renderer.render(data)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            name = type(renderer).__name__
+            results[name] = content
+            self.stdout.write(
+                f'{name:<20} {median(timings):>9.2f} мс '
+                f'{len(content) / 1024:>9.1f} КБ ответ '
+                f'{peak / 1024:>9.1f} КБ памяти'
+            )
+        if len(set(results.values())) != 1:
+            self.stdout.write(self.style.WARNING('Ответы различаются.'))
@@ -0,0 +1,80 @@
+"""
+Сравнение полнотекстового поиска рецептов с поиском по подстроке.
+
+Для каждого запроса несколько раз замеряется время подсчёта найденных
+рецептов и выборки первой страницы полнотекстовым поиском (только
+в PostgreSQL, с фрагментами описания найденных рецептов страницы)
+и поиском icontains по названию, описанию и ингредиентам.
+Без запросов в аргументах ищутся самые частые в рецептах ингредиенты.
+"""
+import time
+from statistics import median, quantiles
+
+from django.core.management import BaseCommand
+from django.db.models import Count
+
+from recipes.models import Ingredient, Recipe
+from recipes.search import (add_headlines, is_supported, search_recipes,
+                            search_recipes_naive)
+
+
+def search_ranked(queryset, text):
+    """Полнотекстовый поиск с сортировкой по релевантности."""
+    return search_recipes(queryset, text).order_by('-search_rank', '-id')
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'Сравнение полнотекстового поиска рецептов с icontains.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            'terms', nargs='*',
+            help='Поисковые запросы.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=10,
+            help='Количество повторов каждого запроса.',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=6,
+            help='Размер первой страницы.',
+        )
+
+    def handle(self, *args, terms, repeat, limit, **options):
+        """Код команды управления Джанго."""
+        queryset = Recipe.objects.defer('search_vector')
+        methods = [('icontains', search_recipes_naive)]
+        if is_supported(queryset):
+            methods.insert(0, ('full text', search_ranked))
+        else:
+            self.stdout.write(self.style.WARNING(
+                'Полнотекстовый поиск требует PostgreSQL, '
+                'замеряется только icontains.'
+            ))
+        for term in terms or self.get_default_terms():
+            for name, search in methods:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    found = search(queryset, term)
+                    count = found.count()
+                    page = list(found[:limit])
+                    if name == 'full text':
+                        add_headlines(page, term)
+                    timings.append((time.perf_counter() - start) * 1000)
+                p95 = (quantiles(timings, n=20)[-1]
+                       if len(timings) > 1 else timings[0])
+                self.stdout.write(
+                    f'{term:<30} {name:<10} {count:>8} рецептов '
+                    f'{median(timings):>9.2f} мс (p95 {p95:.2f} мс)'
+                )
+
+    def get_default_terms(self):
+        """Первые слова названий самых частых в рецептах ингредиентов."""
+        names = Ingredient.objects.annotate(
+            recipes=Count('ingredientamount')
+        ).order_by('-recipes').values_list('name', flat=True)[:3]
+        return [name.split()[0] for name in names]
@@ -0,0 +1,97 @@
+"""
+Замер памяти при скачивании списка покупок разного размера.
+
+В список покупок пользователя добавляется растущее число рецептов
+из базы, например, созданных командой seed_benchmark, и список
+скачивается в каждом формате тестовым клиентом. Для каждого размера
+выводятся время, размер файла и пиковый объём памяти, выделенной
+при формировании ответа, по данным tracemalloc. Пиковая память растёт
+с числом разных ингредиентов, пока они помещаются в одну порцию чтения
+из базы (SHOPPING_CART_CHUNK_SIZE строк), дальше не растёт.
+Каждое скачивание выполняется в транзакции, которая затем откатывается,
+поэтому список покупок пользователя не меняется.
+"""
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, ShoppingCartRecipe
+
+User = get_user_model()
+
+FORMATS = ('txt', 'csv', 'json')
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'Замер памяти при скачивании списка покупок разного размера.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10, 100, 1000],
+            help='Количество рецептов в списке покупок.',
+        )
+
+    def handle(self, *args, sizes, **options):
+        """Код команды управления Джанго."""
+        user = User.objects.first()
+        recipe_ids = list(
+            Recipe.objects.order_by('id').values_list('id', flat=True)[
+                :max(sizes)
+            ]
+        )
+        if user is None or not recipe_ids:
+            raise CommandError('Заполните базу командой seed_benchmark.')
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        url = reverse('api:recipe-download_shopping_cart')
+        # Первое скачивание загружает модули и не замеряется.
+        for file_format in FORMATS:
+            self.download(client, url, file_format)
+
+        for size in sorted(set(sizes)):
+            if size > len(recipe_ids):
+                self.stdout.write(self.style.WARNING(
+                    f'В базе только {len(recipe_ids)} рецептов.'
+                ))
+                break
+            for file_format in FORMATS:
+                with transaction.atomic():
+                    user.shoppingcartrecipe.all().delete()
+                    ShoppingCartRecipe.objects.bulk_create(
+                        ShoppingCartRecipe(user=user, recipe_id=recipe_id)
+                        for recipe_id in recipe_ids[:size]
+                    )
+                    elapsed, length, peak = self.download(
+                        client, url, file_format
+                    )
+                    transaction.set_rollback(True)
+                self.stdout.write(
+                    f'{size:>6} рецептов {file_format:<5} '
+                    f'{elapsed:>9.2f} мс '
+                    f'{length / 1024:>9.1f} КБ файл '
+                    f'{peak / 1024:>9.1f} КБ памяти'
+                )
+
+    def download(self, client, url, file_format):
+        """Время, размер файла и пиковая память скачивания."""
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = client.get(url, {'format': file_format})
+        chunks = (
+            response.streaming_content if response.streaming
+            else [response.content]
+        )
+        length = sum(len(chunk) for chunk in chunks)
+        elapsed = (time.perf_counter() - start) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        response.close()
+        return elapsed, length, peak
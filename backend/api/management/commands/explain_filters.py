@@ -0,0 +1,125 @@
+"""
+Проверка использования индексов фильтрами рецептов и ингредиентов.
+
+Для каждого сочетания параметров RecipeFilter и для IngredientFilter
+выполняется EXPLAIN ANALYZE (в PostgreSQL) или EXPLAIN (в других базах)
+запроса, который строит вьюсет, и выводятся способы чтения таблиц.
+Данные для параметров берутся из текущей базы, например, заполненной
+командой seed_benchmark.
+"""
+import re
+from itertools import combinations
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+
+from recipes.models import Ingredient, Recipe, Tag
+from ...filters import IngredientFilter, RecipeFilter
+
+User = get_user_model()
+
+SCAN_PATTERNS = {
+    'postgresql': re.compile(
+        r'((?:Parallel )?(?:Seq|Index Only|Index|Bitmap Index|Bitmap Heap) '
+        r'Scan(?: using \S+)? on \S+)'
+    ),
+    'sqlite': re.compile(r'((?:SCAN|SEARCH) .*)'),
+}
+SEQUENTIAL_SCANS = ('Seq Scan', 'Parallel Seq Scan', 'SCAN ')
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'EXPLAIN запросов фильтров рецептов и ингредиентов.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--user',
+            help='Email пользователя для фильтров избранного и покупок, '
+                 'по умолчанию пользователь с наибольшим числом избранного.',
+        )
+        parser.add_argument(
+            '--ingredient', default='мо',
+            help='Начало названия ингредиента для фильтра ингредиентов.',
+        )
+
+    def handle(self, *args, user, ingredient, **options):
+        """Код команды управления Джанго."""
+        self.verbosity = options['verbosity']
+        if connection.vendor not in SCAN_PATTERNS:
+            raise CommandError(
+                f'Разбор плана для {connection.vendor} не поддерживается.'
+            )
+        user = self.get_user(user)
+        author = Recipe.objects.values_list('author', flat=True).first()
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        if author is None or not tags:
+            raise CommandError('В базе нет рецептов или тегов.')
+
+        request = RequestFactory().get('/')
+        request.user = user
+        params = {
+            'author': str(author),
+            'tags': tags,
+            'is_favorited': '1',
+            'is_in_shopping_cart': '1',
+        }
+        for size in range(len(params) + 1):
+            for names in combinations(params, size):
+                data = {name: params[name] for name in names}
+                queryset = RecipeFilter(
+                    self.query_dict(data),
+                    queryset=Recipe.objects.with_related(),
+                    request=request,
+                ).qs[:settings.REST_FRAMEWORK['PAGE_SIZE']]
+                self.report(f'recipes {data or "без фильтров"}', queryset)
+
+        queryset = IngredientFilter(
+            self.query_dict({'name': ingredient}),
+            queryset=Ingredient.objects.all(),
+        ).qs
+        self.report(f'ingredients name={ingredient}', queryset)
+
+    def get_user(self, email):
+        """Пользователь, для которого строятся запросы."""
+        if email:
+            try:
+                return User.objects.get(email=email)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {email} не найден.')
+        user = User.objects.annotate(
+            favorites=Count('favoriterecipe')
+        ).order_by('-favorites').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей.')
+        return user
+
+    def query_dict(self, data):
+        """Параметры запроса в виде QueryDict."""
+        return RequestFactory().get('/', data).GET
+
+    def report(self, title, queryset):
+        """Вывод способов чтения таблиц из плана запроса."""
+        if connection.vendor == 'postgresql':
+            plan = queryset.explain(analyze=True)
+        else:
+            plan = queryset.explain()
+        scans = SCAN_PATTERNS[connection.vendor].findall(plan)
+        sequential = [
+            scan for scan in scans if scan.startswith(SEQUENTIAL_SCANS)
+        ]
+        style = self.style.WARNING if sequential else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{title}: '
+            f'{"есть последовательное чтение" if sequential else "индексы"}'
+        ))
+        for scan in scans:
+            self.stdout.write(f'    {scan}')
+        if self.verbosity > 1:
+            self.stdout.write(plan)
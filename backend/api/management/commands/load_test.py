@@ -0,0 +1,117 @@
+"""
+Нагрузочная проверка запущенного сервера на маршрутах просмотра.
+
+Список рецептов, рецепт, поиск ингредиентов и теги запрашиваются
+по HTTP заданным числом одновременных клиентов в течение заданного
+времени. Для каждого маршрута и числа клиентов выводятся количество
+ответов в секунду, медиана и 95-й перцентиль времени ответа и число
+ошибок. Для сравнения развёртываний команда запускается для сервера
+под WSGI и под ASGI, например:
+
+gunicorn --workers 4 foodgram_backend.wsgi
+gunicorn --workers 4 --worker-class uvicorn.workers.UvicornWorker \
+    foodgram_backend.asgi:application
+"""
+import time
+from http.client import HTTPConnection, HTTPException
+from statistics import median, quantiles
+from threading import Thread
+from urllib.parse import urlsplit
+
+from django.core.management import BaseCommand, CommandError
+
+from recipes.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'Нагрузочная проверка сервера на маршрутах просмотра.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            'url', nargs='?', default='http://localhost:8000',
+            help='Адрес сервера.',
+        )
+        parser.add_argument(
+            '--concurrency', nargs='+', type=int, default=[1, 10, 50],
+            help='Количество одновременных клиентов.',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Время нагрузки каждого маршрута в секундах.',
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен пользователя для запросов с авторизацией.',
+        )
+
+    def handle(self, *args, url, concurrency, duration, token, **options):
+        """Код команды управления Джанго."""
+        recipe = Recipe.objects.order_by('-id').first()
+        ingredient = Ingredient.objects.order_by('id').first()
+        if recipe is None or ingredient is None:
+            raise CommandError('Заполните базу командой seed_benchmark.')
+        server = urlsplit(url)
+        headers = {'Accept': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        paths = (
+            ('recipes', '/api/recipes/'),
+            ('recipe', f'/api/recipes/{recipe.id}/'),
+            ('ingredients', f'/api/ingredients/?name={ingredient.name[:2]}'),
+            ('tags', '/api/tags/'),
+        )
+        for name, path in paths:
+            for clients in concurrency:
+                timings, errors = self.load(
+                    server, path, headers, clients, duration
+                )
+                if not timings:
+                    raise CommandError(f'{path}: нет успешных ответов.')
+                p95 = (quantiles(timings, n=20)[-1]
+                       if len(timings) > 1 else timings[0])
+                self.stdout.write(
+                    f'{name:<12} {clients:>4} клиентов '
+                    f'{len(timings) / duration:>9.1f} ответов/с '
+                    f'{median(timings):>9.2f} мс (p95 {p95:.2f} мс) '
+                    f'{errors} ошибок'
+                )
+
+    def load(self, server, path, headers, clients, duration):
+        """Запросы к маршруту от clients клиентов в течение duration."""
+        deadline = time.perf_counter() + duration
+        timings = []
+        errors = []
+        threads = [
+            Thread(
+                target=self.client,
+                args=(server, path, headers, deadline, timings, errors),
+            )
+            for _ in range(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, len(errors)
+
+    def client(self, server, path, headers, deadline, timings, errors):
+        """Последовательные запросы одного клиента по одному соединению."""
+        connection = HTTPConnection(server.hostname, server.port or 80)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (HTTPException, OSError) as error:
+                errors.append(error)
+                connection.close()
+                continue
+            if response.status == 200:
+                timings.append((time.perf_counter() - start) * 1000)
+            else:
+                errors.append(response.status)
+        connection.close()
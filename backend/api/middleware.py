@@ -0,0 +1,249 @@
+"""
+Промежуточный слой сбора метрик запросов.
+
+Для каждого запроса считаются количество и время SQL-запросов,
+время сериализации данных сериалайзерами, время отрисовки ответа
+в JSON или другой формат и общее время. Они передаются
+клиенту в заголовке Server-Timing и накапливаются по представлениям
+для выдачи в формате Prometheus по адресу /api/metrics/.
+Доля запросов PROFILING_SAMPLE_RATE профилируется cProfile с сохранением
+результатов в PROFILING_DIR.
+
+SQL-запросы учитываются обёрткой, которая подключается к каждому
+соединению с базой и находит счётчик запроса в контекстной переменной.
+Поэтому учитываются и запросы, выполненные в других потоках, например,
+асинхронными представлениями под ASGI. Так же по контекстной переменной
+учитывается время получения data у сериалайзеров с TimedDataMixin.
+SQL-запросы во время сериализации входят и во время сериализации.
+"""
+import asyncio
+import cProfile
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from threading import Lock
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+METRICS = (
+    ('requests_total', 'Количество запросов.', 'counter'),
+    ('db_queries_total', 'Количество SQL-запросов.', 'counter'),
+    ('db_seconds_total', 'Время выполнения SQL-запросов.', 'counter'),
+    ('serialize_seconds_total', 'Время сериализации данных.', 'counter'),
+    ('render_seconds_total', 'Время отрисовки ответов.', 'counter'),
+    ('request_seconds_total', 'Общее время обработки запросов.', 'counter'),
+)
+
+
+class MetricsRegistry:
+    """Накопленные метрики по представлениям и методам запросов."""
+
+    def __init__(self):
+        """Пустой набор метрик."""
+        self._lock = Lock()
+        self._values = defaultdict(lambda: [0] * len(METRICS))
+
+    def observe(self, view, method, *values):
+        """Добавление значений метрик одного запроса."""
+        with self._lock:
+            totals = self._values[(view, method)]
+            for index, value in enumerate(values):
+                totals[index] += value
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        with self._lock:
+            values = {
+                key: list(totals) for key, totals in self._values.items()
+            }
+        lines = []
+        for index, (name, description, kind) in enumerate(METRICS):
+            lines.append(f'# HELP foodgram_{name} {description}')
+            lines.append(f'# TYPE foodgram_{name} {kind}')
+            for (view, method), totals in sorted(values.items()):
+                lines.append(
+                    f'foodgram_{name}{{view="{view}",method="{method}"}} '
+                    f'{totals[index]}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+query_timer = ContextVar('query_timer', default=None)
+serialization_timer = ContextVar('serialization_timer', default=None)
+
+
+class QueryTimer:
+    """Обёртка выполнения SQL-запросов для подсчёта их количества и времени."""
+
+    def __init__(self):
+        """Обнулённые счётчики."""
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Выполнение запроса с замером времени."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class SerializationTimer:
+    """Счётчик времени сериализации без учёта вложенных сериалайзеров."""
+
+    def __init__(self):
+        """Обнулённый счётчик."""
+        self.duration = 0
+        self.depth = 0
+
+
+@contextmanager
+def measure_serialization():
+    """Учёт времени сериализации в счётчике текущего запроса."""
+    timer = serialization_timer.get()
+    if timer is None or timer.depth:
+        yield
+        return
+    timer.depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.duration += time.perf_counter() - start
+        timer.depth -= 1
+
+
+def record_query(execute, sql, params, many, context):
+    """Выполнение SQL-запроса с учётом в счётчике текущего запроса."""
+    timer = query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    """
+    Подключение учёта SQL-запросов к соединению.
+
+    Обёртка ставится первой, чтобы не мешать временным обёрткам,
+    которые снимаются с конца списка.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class MetricsMiddleware:
+    """Сбор метрик запроса и заголовок Server-Timing."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Инициализация промежуточного слоя."""
+        self.get_response = get_response
+        connection_created.connect(
+            install_query_recorder, dispatch_uid='api_query_recorder'
+        )
+        for connection in connections.all():
+            install_query_recorder(connection=connection)
+        if asyncio.iscoroutinefunction(self.get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        """Обработка запроса с замером времени."""
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        request._render_duration = 0
+        timer = QueryTimer()
+        serialization = SerializationTimer()
+        profile = None
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            profile = cProfile.Profile()
+
+        start = time.perf_counter()
+        token = query_timer.set(timer)
+        serialization_token = serialization_timer.set(serialization)
+        try:
+            if profile is not None:
+                profile.enable()
+            response = self.get_response(request)
+            if profile is not None:
+                profile.disable()
+        finally:
+            serialization_timer.reset(serialization_token)
+            query_timer.reset(token)
+        total = time.perf_counter() - start
+        self.observe(request, response, timer, serialization, total)
+        if profile is not None:
+            self.dump_profile(profile, request)
+        return response
+
+    async def __acall__(self, request):
+        """
+        Асинхронная обработка запроса с замером времени.
+
+        Представления выполняются в других потоках, поэтому
+        в асинхронном режиме запросы не профилируются.
+        """
+        request._render_duration = 0
+        timer = QueryTimer()
+        serialization = SerializationTimer()
+        start = time.perf_counter()
+        token = query_timer.set(timer)
+        serialization_token = serialization_timer.set(serialization)
+        try:
+            response = await self.get_response(request)
+        finally:
+            serialization_timer.reset(serialization_token)
+            query_timer.reset(token)
+        self.observe(
+            request, response, timer, serialization,
+            time.perf_counter() - start,
+        )
+        return response
+
+    def observe(self, request, response, timer, serialization, total):
+        """Учёт метрик запроса и заголовок Server-Timing."""
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.observe(
+            view, request.method,
+            1, timer.count, timer.duration, serialization.duration,
+            request._render_duration, total,
+        )
+        response['Server-Timing'] = (
+            f'db;desc="{timer.count} queries";'
+            f'dur={timer.duration * 1000:.2f}, '
+            f'serialize;dur={serialization.duration * 1000:.2f}, '
+            f'render;dur={request._render_duration * 1000:.2f}, '
+            f'total;dur={total * 1000:.2f}'
+        )
+
+    def process_template_response(self, request, response):
+        """Замер времени отрисовки ответа DRF в JSON или другой формат."""
+        start = time.perf_counter()
+
+        def finish(response):
+            request._render_duration += time.perf_counter() - start
+
+        response.add_post_render_callback(finish)
+        return response
+
+    def dump_profile(self, profile, request):
+        """Сохранение результатов профилирования."""
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(
+            directory / f'{time.time():.6f}-{view.replace(":", "-")}.prof'
+        )
@@ -1,8 +1,159 @@
 """Пагинации."""
-from rest_framework.pagination import PageNumberPagination
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination, _reverse_ordering)
 
 
 class PageLimitPagination(PageNumberPagination):
     """Пагинация с указанием размера страницы."""
 
     page_size_query_param = 'limit'
+
+
+class CursorLimitPagination(CursorPagination):
+    """
+    Пагинация по курсору с указанием размера страницы.
+
+    Курсор хранит значения всех полей сортировки последнего рецепта
+    страницы, последнее из них — уникальный id. Следующая страница
+    выбирается условием по этим значениям без COUNT и OFFSET, поэтому
+    совпадающие значения первого поля, например, нулевая популярность,
+    не приводят к повторам и пропускам, а глубина страницы не влияет
+    на скорость запроса. Если порядок уже задан фильтром, курсор
+    строится по нему.
+    """
+
+    ordering = '-id'
+    page_size_query_param = 'limit'
+
+    def get_ordering(self, request, queryset, view):
+        """Порядок из запроса или порядок по умолчанию."""
+        if queryset.query.order_by:
+            return tuple(queryset.query.order_by)
+        return super().get_ordering(request, queryset, view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Страница после или перед позицией из курсора."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor and self.cursor.position
+
+        ordering = (
+            _reverse_ordering(self.ordering) if reverse else self.ordering
+        )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = self.filter_after(queryset, ordering, position)
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = bool(self.page), has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None and bool(self.page)
+        if self.has_previous or self.has_next:
+            self.display_page_controls = self.template is not None
+        return self.page
+
+    def filter_after(self, queryset, ordering, position):
+        """
+        Объекты после позиции в порядке ordering.
+
+        Условие (a, b) > (x, y) раскрывается в a > x OR a = x AND b > y
+        с учётом направления каждого поля и дополняется условием a >= x
+        для поиска по индексу.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        fields = [
+            (order.lstrip('-'), order.startswith('-'), value)
+            for order, value in zip(ordering, values)
+        ]
+        conditions = []
+        for index, (field, descending, value) in enumerate(fields):
+            lookup = 'lt' if descending else 'gt'
+            condition = Q(**{f'{field}__{lookup}': value})
+            for equal_field, _, equal_value in fields[:index]:
+                condition &= Q(**{equal_field: equal_value})
+            conditions.append(condition)
+        field, descending, value = fields[0]
+        bound = Q(**{f'{field}__{"lte" if descending else "gte"}': value})
+        try:
+            return queryset.filter(bound, reduce(or_, conditions))
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_position(self, instance):
+        """Позиция объекта: значения полей сортировки."""
+        return json.dumps(
+            [getattr(instance, order.lstrip('-')) for order in self.ordering],
+            separators=(',', ':'),
+        )
+
+    def get_next_link(self):
+        """Ссылка на страницу после последнего объекта."""
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False, position=self.get_position(self.page[-1])
+        ))
+
+    def get_previous_link(self):
+        """Ссылка на страницу перед первым объектом."""
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=True, position=self.get_position(self.page[0])
+        ))
+
+
+class PageOrCursorPagination(PageLimitPagination):
+    """
+    Пагинация по номеру страницы или, по запросу, по курсору.
+
+    Пагинация по курсору включается параметром pagination=cursor,
+    ссылки на соседние страницы содержат параметр cursor.
+    """
+
+    cursor_pagination_class = CursorLimitPagination
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        """Выбрана ли в запросе пагинация по курсору."""
+        if request.query_params.get('pagination') == 'cursor':
+            return True
+        cursor_query_param = self.cursor_pagination_class.cursor_query_param
+        return cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Разбиение на страницы выбранным способом."""
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        """Ответ со страницей, выбранной способом пагинации."""
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
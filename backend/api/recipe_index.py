@@ -0,0 +1,205 @@
+"""
+Индекс рецептов по ингредиентам для подбора рецептов из имеющихся продуктов.
+
+Индекс хранится в памяти процесса: для каждого ингредиента — отсортированный
+массив идентификаторов рецептов, для каждого рецепта — количество его
+ингредиентов. Совпадения считаются по массивам выбранных ингредиентов без
+запросов к базе.
+
+Индекс строится один раз при первом обращении, дальше он обновляется
+по журналу изменений в общем кеше. После фиксации изменения ингредиентов
+рецепта номер журнала увеличивается, а под ключом с этим номером
+сохраняется идентификатор рецепта. Перед подбором процесс читает записи
+журнала после своего номера и перечитывает из базы ингредиенты только
+этих рецептов. Если записей не хватает, например, после очистки кеша
+или массовой загрузки, индекс строится заново: одним потоком, остальные
+потоки до конца построения подбирают по прежнему индексу.
+
+Журнал хранится в кеше Django, поэтому при нескольких процессах нужен
+общий кеш, например, Redis (CACHE_BACKEND). С кешем в памяти процесса
+по умолчанию каждый процесс видит только свои изменения, и индексы
+других процессов устаревают до перезапуска.
+"""
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from itertools import chain
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from recipes.models import IngredientAmount
+
+SEQUENCE_KEY = 'api:recipe-index:sequence'
+CHANGE_KEY = 'api:recipe-index:change:{}'
+
+# Больше изменений дешевле применить построением индекса заново.
+MAX_CHANGES = 1000
+
+# Запись журнала, по которой индекс строится заново.
+REBUILD = 'rebuild'
+
+
+def get_sequence():
+    """
+    Номер последней записи журнала изменений.
+
+    Журнал начинается с текущего времени в миллисекундах: после очистки
+    кеша номера не повторяют прежние, и процессы строят индекс заново.
+    """
+    sequence = cache.get(SEQUENCE_KEY)
+    if sequence is None:
+        cache.add(SEQUENCE_KEY, int(time.time() * 1000), None)
+        sequence = cache.get(SEQUENCE_KEY, 0)
+    return sequence
+
+
+def log_change(recipe_id=REBUILD):
+    """Запись в журнал изменения ингредиентов рецепта."""
+    get_sequence()
+    try:
+        sequence = cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        # Журнал пропал из кеша, новый журнал вызовет построение заново.
+        return
+    cache.set(
+        CHANGE_KEY.format(sequence), recipe_id, settings.API_CACHE_TIMEOUT
+    )
+
+
+class RecipeIngredientIndex:
+    """Индекс рецептов по ингредиентам."""
+
+    def __init__(self):
+        """Пустой индекс, который построится при первом подборе."""
+        self._state = (None, None)
+        self._lock = Lock()
+
+    def _get_data(self):
+        """Данные индекса, актуальные для журнала изменений."""
+        sequence = get_sequence()
+        built_sequence, data = self._state
+        if sequence == built_sequence:
+            return data
+        if not self._lock.acquire(blocking=data is None):
+            return data
+        try:
+            built_sequence, data = self._state
+            if sequence != built_sequence:
+                self._update(sequence)
+            return self._state[1]
+        finally:
+            self._lock.release()
+
+    def _update(self, sequence):
+        """Применение журнала изменений или построение индекса заново."""
+        built_sequence, data = self._state
+        changes = None
+        if data is not None and built_sequence < sequence:
+            if sequence - built_sequence <= MAX_CHANGES:
+                keys = [
+                    CHANGE_KEY.format(number)
+                    for number in range(built_sequence + 1, sequence + 1)
+                ]
+                changes = cache.get_many(keys)
+                if len(changes) < len(keys) or REBUILD in changes.values():
+                    changes = None
+        if changes is None:
+            self._state = (sequence, self._build())
+        else:
+            self._state = (sequence, self._patch(data, set(changes.values())))
+
+    def _build(self):
+        """
+        Построение индекса по всем ингредиентам рецептов.
+
+        Индекс строится по основной базе: реплика может отставать
+        от журнала изменений.
+        """
+        recipes = {}
+        sizes = Counter()
+        rows = IngredientAmount.objects.using(DEFAULT_DB_ALIAS).order_by(
+            'ingredient_id', 'recipe_id'
+        ).values_list('ingredient_id', 'recipe_id')
+        for ingredient_id, recipe_id in rows.iterator():
+            recipes.setdefault(ingredient_id, array('L')).append(recipe_id)
+            sizes[recipe_id] += 1
+        return recipes, sizes
+
+    def _patch(self, data, recipe_ids):
+        """
+        Индекс с перечитанными ингредиентами рецептов recipe_ids.
+
+        Изменённые массивы и количества ингредиентов заменяются копиями,
+        поэтому подбор в других потоках не видит наполовину изменённых
+        данных.
+        """
+        recipes, sizes = data
+        sizes = Counter(sizes)
+        added = defaultdict(list)
+        for ingredient_id, recipe_id in IngredientAmount.objects.using(
+            DEFAULT_DB_ALIAS
+        ).filter(recipe_id__in=recipe_ids).values_list(
+            'ingredient_id', 'recipe_id'
+        ):
+            added[ingredient_id].append(recipe_id)
+
+        recipes = dict(recipes)
+        for ingredient_id in set(recipes) | set(added):
+            current = recipes.get(ingredient_id, array('L'))
+            new = added.get(ingredient_id, ())
+            present = [
+                recipe_id for recipe_id in recipe_ids
+                if self._contains(current, recipe_id)
+            ]
+            if not present and not new:
+                continue
+            updated = array('L', current)
+            for recipe_id in present:
+                del updated[bisect_left(updated, recipe_id)]
+            for recipe_id in new:
+                insort(updated, recipe_id)
+            recipes[ingredient_id] = updated
+
+        counts = Counter(chain.from_iterable(added.values()))
+        for recipe_id in recipe_ids:
+            if counts[recipe_id]:
+                sizes[recipe_id] = counts[recipe_id]
+            else:
+                sizes.pop(recipe_id, None)
+        return recipes, sizes
+
+    @staticmethod
+    def _contains(recipe_ids, recipe_id):
+        """Есть ли recipe_id в отсортированном массиве."""
+        index = bisect_left(recipe_ids, recipe_id)
+        return index < len(recipe_ids) and recipe_ids[index] == recipe_id
+
+    def match(self, ingredient_ids, max_missing=0):
+        """
+        Подбор рецептов по имеющимся ингредиентам.
+
+        Возвращает список троек: идентификатор рецепта, количество
+        имеющихся и недостающих ингредиентов — для рецептов, где
+        недостаёт не больше max_missing ингредиентов. Сначала идут
+        рецепты с меньшим числом недостающих ингредиентов, затем
+        с большим числом имеющихся, затем новые.
+        """
+        recipes, sizes = self._get_data()
+        matched = Counter(chain.from_iterable(
+            recipes.get(ingredient_id, ())
+            for ingredient_id in set(ingredient_ids)
+        ))
+        found = [
+            (recipe_id, count, sizes[recipe_id] - count)
+            for recipe_id, count in matched.items()
+            if sizes[recipe_id] - count <= max_missing
+        ]
+        found.sort(key=lambda item: (item[2], -item[1], -item[0]))
+        return found
+
+
+recipe_index = RecipeIngredientIndex()
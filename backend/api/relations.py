@@ -0,0 +1,73 @@
+"""
+Кеш связей пользователя с рецептами и авторами.
+
+Множества избранных рецептов, рецептов в списке покупок и авторов,
+на которых подписан пользователь, загружаются одним запросом, хранятся
+в общем кеше и запоминаются у запроса. Статусы is_favorited,
+is_in_shopping_cart и is_subscribed определяются проверкой вхождения
+в множества. Кеш пользователя сбрасывается сигналами и пакетными
+изменениями после фиксации транзакции.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import IntegerField, Value
+
+from recipes.models import FavoriteRecipe, ShoppingCartRecipe
+from users.models import Subscription
+
+RELATIONS_KEY = 'api:relations:{}'
+
+Relations = namedtuple('Relations', ('favorites', 'cart', 'subscriptions'))
+
+EMPTY_RELATIONS = Relations(frozenset(), frozenset(), frozenset())
+
+
+def load_relations(user):
+    """
+    Загрузка связей пользователя одним запросом.
+
+    Связи долго хранятся в кеше, поэтому читаются из основной базы,
+    а не из реплики, которая может отставать.
+    """
+    querysets = [
+        model.objects.using(DEFAULT_DB_ALIAS).filter(
+            user=user
+        ).order_by().annotate(
+            kind=Value(kind, output_field=IntegerField())
+        ).values_list('kind', field)
+        for kind, (model, field) in enumerate((
+            (FavoriteRecipe, 'recipe_id'),
+            (ShoppingCartRecipe, 'recipe_id'),
+            (Subscription, 'author_id'),
+        ))
+    ]
+    ids = ([], [], [])
+    for kind, pk in querysets[0].union(*querysets[1:], all=True):
+        ids[kind].append(pk)
+    return Relations(*map(frozenset, ids))
+
+
+def get_relations(request):
+    """Связи текущего пользователя, один раз за запрос."""
+    relations = getattr(request, '_relations', None)
+    if relations is not None:
+        return relations
+    user = request.user
+    if user.is_anonymous:
+        relations = EMPTY_RELATIONS
+    else:
+        key = RELATIONS_KEY.format(user.pk)
+        relations = cache.get(key)
+        if relations is None:
+            relations = load_relations(user)
+            cache.set(key, relations, settings.API_CACHE_TIMEOUT)
+    request._relations = relations
+    return relations
+
+
+def invalidate_relations(user_id):
+    """Сброс кеша связей пользователя."""
+    cache.delete(RELATIONS_KEY.format(user_id))
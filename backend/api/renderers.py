@@ -0,0 +1,79 @@
+"""Рендереры приложения API."""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class PlainTextRenderer(BaseRenderer):
+    """Рендерер простого текста."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Преобразование данных в текст, например, сообщений об ошибках."""
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data).encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+    """Рендерер CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Рендерер JSON на orjson.
+
+    Типы, которых нет в JSON, преобразуются кодировщиком DRF,
+    поэтому для строк, целых чисел, дат и Decimal результат совпадает
+    со стандартным JSONRenderer. Вещественные числа отличаются записью
+    экспоненты: 1e20 вместо 1e+20, значения при разборе те же. NaN
+    и бесконечность orjson записывает как null, а JSONRenderer со строгим
+    JSON вызывает ValueError; в ответах API таких чисел нет.
+    Если orjson не установлен, запрошены отступы или экранирование
+    не-ASCII символов, а также для данных, которые orjson не может
+    сериализовать, например, целых чисел больше 64 бит, используется
+    стандартный JSONRenderer.
+    """
+
+    if orjson is not None:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def use_orjson(self, accepted_media_type, renderer_context):
+        """Можно ли преобразовать данные с помощью orjson."""
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return False
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        return indent is None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Преобразование данных в JSON."""
+        if data is None:
+            return b''
+        if self.use_orjson(accepted_media_type, renderer_context):
+            try:
+                ret = orjson.dumps(
+                    data,
+                    default=self.encoder_class().default,
+                    option=self.options,
+                )
+            except orjson.JSONEncodeError:
+                pass
+            else:
+                # Как и JSONRenderer, экранируем U+2028 и U+2029.
+                return ret.replace(
+                    '\u2028'.encode(), b'\\u2028'
+                ).replace(
+                    '\u2029'.encode(), b'\\u2029'
+                )
+        return super().render(data, accepted_media_type, renderer_context)
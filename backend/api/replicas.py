@@ -0,0 +1,105 @@
+"""
+Чтение из реплик базы данных.
+
+Безопасные запросы к представлениям с replica_reads читают данные
+из случайной реплики из DATABASE_REPLICAS: база чтения хранится
+в контекстной переменной, которую читает ReplicaRouter. После успешного
+изменяющего запроса чтения пользователя DATABASE_REPLICA_PIN_SECONDS
+секунд идут в основную базу, и он видит свои изменения, даже если
+реплики отстают. Отметка хранится в кеше, поэтому при нескольких
+процессах нужен общий кеш.
+
+Данные из реплики вскоре после изменения могут быть устаревшими,
+поэтому кеши по версиям моделей сохраняют их, только если версии
+изменились больше DATABASE_REPLICA_PIN_SECONDS секунд назад.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_KEY = 'api:replica-pin:{}'
+
+read_database = ContextVar('read_database', default=None)
+
+
+class ReplicaRouter:
+    """Маршрутизатор чтения в реплику, выбранную для запроса."""
+
+    def db_for_read(self, model, **hints):
+        """База для чтения, по умолчанию основная."""
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        """Запись всегда в основную базу."""
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Реплики содержат те же данные, что и основная база."""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Миграции только в основной базе, реплики её копируют."""
+        return db not in settings.DATABASE_REPLICAS
+
+
+def pin_to_primary(user):
+    """Чтение пользователя из основной базы на время отставания реплик."""
+    if settings.DATABASE_REPLICAS and user.is_authenticated:
+        cache.set(
+            PIN_KEY.format(user.pk), True,
+            settings.DATABASE_REPLICA_PIN_SECONDS,
+        )
+
+
+def is_pinned(user):
+    """Читает ли пользователь из основной базы."""
+    if not user.is_authenticated:
+        return False
+    return cache.get(PIN_KEY.format(user.pk)) is not None
+
+
+def can_cache(versions):
+    """Можно ли сохранить в кеш данные, прочитанные для версий versions."""
+    if read_database.get() is None:
+        return True
+    return (
+        time.time() - max(versions) > settings.DATABASE_REPLICA_PIN_SECONDS
+    )
+
+
+class ReplicaReadMixin:
+    """
+    Чтение из реплики в безопасных запросах.
+
+    После успешного изменяющего запроса чтения пользователя
+    закрепляются за основной базой. Если у вьюсета replica_reads
+    выключено, он только закрепляет пользователей, изменивших данные.
+    """
+
+    replica_reads = True
+
+    def initial(self, request, *args, **kwargs):
+        """Выбор реплики после аутентификации и проверки прав."""
+        super().initial(request, *args, **kwargs)
+        if not self.replica_reads or not settings.DATABASE_REPLICAS:
+            return
+        if request.method not in SAFE_METHODS or is_pinned(request.user):
+            return
+        self._read_database = read_database.set(
+            random.choice(settings.DATABASE_REPLICAS)
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Возврат к основной базе и закрепление после изменений."""
+        token = getattr(self, '_read_database', None)
+        if token is not None:
+            read_database.reset(token)
+            self._read_database = None
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
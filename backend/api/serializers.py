@@ -1,47 +1,118 @@
 """Сериалайзеры приложения API."""
+import re
 from base64 import b64decode
+from binascii import Error as BinasciiError
 
-from django.db import transaction
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from rest_framework import serializers
 
+from recipes.counters import change_counters
+from recipes.images import delete_renditions, schedule_renditions
 from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from .fragments import get_fragments
+from .middleware import measure_serialization
+from .relations import get_relations
 
 User = get_user_model()
 
+BASE64_IGNORED = re.compile('[^A-Za-z0-9+/=]')
+
 #
 # Вспомогательные сериалайзеры.
 #
 
 
 class Base64ImageField(serializers.ImageField):
-    """Поле изображения, которое пребразует base64-картинку в файл."""
+    """
+    Поле изображения, которое пребразует base64-картинку в файл.
+
+    Картинка декодируется по частям во временный файл на диске,
+    чтобы не держать в памяти ещё одну полную копию изображения.
+    Переносы строк и другие символы не из алфавита base64 пропускаются,
+    а неполная группа из четырёх символов переносится в следующую часть.
+    """
+
+    chunk_size = 64 * 1024
 
     def to_internal_value(self, data):
         """Преобразование входных данных."""
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
+            try:
+                format, imgstr = data.split(';base64,')
+            except ValueError:
+                self.fail('invalid_image')
             ext = format.split('/')[-1]
-            data = ContentFile(b64decode(imgstr), name='temp.' + ext)
+            file = TemporaryUploadedFile(
+                name='temp.' + ext,
+                content_type=format[len('data:'):],
+                size=None,
+                charset=None,
+            )
+            try:
+                rest = ''
+                for start in range(0, len(imgstr), self.chunk_size):
+                    chunk = rest + BASE64_IGNORED.sub(
+                        '', imgstr[start:start + self.chunk_size]
+                    )
+                    aligned = len(chunk) - len(chunk) % 4
+                    file.write(b64decode(chunk[:aligned]))
+                    rest = chunk[aligned:]
+                if rest:
+                    file.write(b64decode(rest))
+            except BinasciiError:
+                file.close()
+                self.fail('invalid_image')
+            file.size = file.tell()
+            file.seek(0)
+            data = file
         return super(Base64ImageField, self).to_internal_value(data)
 
+
+class TimedDataMixin:
+    """Учёт времени получения data в метриках запроса."""
+
+    @property
+    def data(self):
+        """Данные сериалайзера с замером времени."""
+        with measure_serialization():
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    """Сериалайзер списка с учётом времени сериализации."""
+
+
+class BatchSerializer(serializers.Serializer):
+    """Сериалайзер списка идентификаторов для пакетных изменений."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+    def validate_ids(self, ids):
+        """Удаление повторов с сохранением порядка."""
+        return list(dict.fromkeys(ids))
+
 #
 # Пользователь — основной сериалайзер.
 #
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Сериалайзер пользователя."""
 
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, obj):
         """Статус подписки на пользователя."""
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.subscriber.filter(author=obj).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        request = self.context.get('request')
+        return obj.pk in get_relations(request).subscriptions
 
     class Meta:
         """Метаданные пользователя."""
@@ -51,13 +122,14 @@ class UserSerializer(serializers.ModelSerializer):
             'id', 'email', 'username', 'first_name', 'last_name',
             'is_subscribed',
         )
+        list_serializer_class = TimedListSerializer
 
 #
 # Рецепт — вспомогательные сериалайзеры.
 #
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Сериалайзер тега."""
 
     class Meta:
@@ -67,9 +139,10 @@ class TagSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'name', 'color', 'slug',
         )
+        list_serializer_class = TimedListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Сериалайзер ингредиента."""
 
     class Meta:
@@ -79,9 +152,10 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'name', 'measurement_unit',
         )
+        list_serializer_class = TimedListSerializer
 
 
-class RecipeSimpleSerializer(serializers.ModelSerializer):
+class RecipeSimpleSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Упрощённый сериалайзер рецепта при просмотре."""
 
     class Meta:
@@ -89,8 +163,10 @@ class RecipeSimpleSerializer(serializers.ModelSerializer):
 
         model = Recipe
         fields = (
-            'id', 'name', 'image', 'cooking_time',
+            'id', 'name', 'image', 'image_thumbnail', 'image_webp',
+            'cooking_time',
         )
+        list_serializer_class = TimedListSerializer
 
 #
 # Рецепт — сериалайзеры просмотра.
@@ -115,8 +191,30 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
-    """Сериалайзер рецепта при просмотре."""
+class RecipeListSerializer(TimedListSerializer):
+    """Сериалайзер списка рецептов с кешем представлений."""
+
+    def to_representation(self, data):
+        """Преобразование выходных данных с одним обращением к кешу."""
+        recipes = list(
+            data.all() if isinstance(data, models.Manager) else data
+        )
+        fragments = get_fragments(
+            recipes, self.context.get('request'), self.child.to_fragment
+        )
+        return [
+            self.child.personalize(recipe, fragment)
+            for recipe, fragment in zip(recipes, fragments)
+        ]
+
+
+class RecipeSerializer(TimedDataMixin, serializers.ModelSerializer):
+    """
+    Сериалайзер рецепта при просмотре.
+
+    Представление без статусов, зависящих от пользователя, берётся
+    из кеша, статусы подставляются по кешу связей пользователя.
+    """
 
     tags = TagSerializer(many=True, read_only=True)
     author = UserSerializer(read_only=True)
@@ -127,19 +225,21 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
+    # Поля, которые выводятся, только если заданы у рецепта
+    # поиском или подбором по ингредиентам.
+    optional_fields = (
+        'search_headline', 'matched_ingredients', 'missing_ingredients',
+    )
+
     def get_is_favorited(self, obj):
         """Статус наличие рецепта в избранном пользователя."""
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.favoriterecipe.filter(recipe=obj).exists()
+        request = self.context.get('request')
+        return obj.pk in get_relations(request).favorites
 
     def get_is_in_shopping_cart(self, obj):
         """Статус наличие рецепта в списке покупок пользователя."""
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.shoppingcartrecipe.filter(recipe=obj).exists()
+        request = self.context.get('request')
+        return obj.pk in get_relations(request).cart
 
     class Meta:
         """Метаданные рецепта при просмотре."""
@@ -148,8 +248,51 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time',
+            'name', 'image', 'image_thumbnail', 'image_webp',
+            'text', 'cooking_time',
+        )
+        list_serializer_class = RecipeListSerializer
+
+    def to_fragment(self, recipe):
+        """Представление рецепта для кеша."""
+        return super().to_representation(recipe)
+
+    def personalize(self, recipe, fragment):
+        """Представление из кеша со статусами текущего пользователя."""
+        relations = get_relations(self.context.get('request'))
+        data = dict(fragment)
+        data['author'] = dict(
+            fragment['author'],
+            is_subscribed=recipe.author_id in relations.subscriptions,
         )
+        data['is_favorited'] = recipe.pk in relations.favorites
+        data['is_in_shopping_cart'] = recipe.pk in relations.cart
+        for field in self.optional_fields:
+            if hasattr(recipe, field):
+                data[field] = getattr(recipe, field)
+        return data
+
+    def to_representation(self, recipe):
+        """Преобразование выходных данных с кешем представления."""
+        fragment, = get_fragments(
+            [recipe], self.context.get('request'), self.to_fragment
+        )
+        return self.personalize(recipe, fragment)
+
+
+class RecipeMatchSerializer(serializers.Serializer):
+    """Сериалайзер параметров подбора рецептов по ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0,
+        max_value=20,
+        default=0,
+    )
 
 #
 # Рецепт — сериалайзеры создания и редактирования.
@@ -172,7 +315,7 @@ class IngredientAmountCUSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeCUSerializer(serializers.ModelSerializer):
+class RecipeCUSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Сериалайзер рецепта при редактировании."""
 
     tags = serializers.PrimaryKeyRelatedField(
@@ -241,29 +384,86 @@ class RecipeCUSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self._create_ingredientamount(ingredients, recipe)
+        change_counters(
+            User.objects.filter(pk=recipe.author_id), recipes_count=1
+        )
+        schedule_renditions(recipe)
         return recipe
 
+    def _update_ingredientamount(self, ingredients, recipe):
+        """
+        Изменение количества ингредиентов в рецепте.
+
+        Текущие количества сравниваются с переданными: удаляются только
+        убранные ингредиенты, обновляются изменённые количества,
+        добавляются новые ингредиенты.
+        """
+        current = {
+            ingredientamount.ingredient_id: ingredientamount
+            for ingredientamount in IngredientAmount.objects.filter(
+                recipe=recipe
+            ).order_by()
+        }
+        submitted = {
+            ingredientamount['id'].pk: ingredientamount
+            for ingredientamount in ingredients
+        }
+        removed = [
+            ingredientamount.pk
+            for ingredient_id, ingredientamount in current.items()
+            if ingredient_id not in submitted
+        ]
+        changed = []
+        added = []
+        for ingredient_id, ingredientamount in submitted.items():
+            existing = current.get(ingredient_id)
+            if existing is None:
+                added.append(ingredientamount)
+            elif existing.amount != ingredientamount['amount']:
+                existing.amount = ingredientamount['amount']
+                changed.append(existing)
+        if removed:
+            IngredientAmount.objects.filter(pk__in=removed).delete()
+        if changed:
+            IngredientAmount.objects.bulk_update(changed, ('amount',))
+        if added:
+            self._create_ingredientamount(added, recipe)
+
     @transaction.atomic
     def update(self, recipe, validated_data):
-        """Переопределение обновления рецепта."""
-        tags = validated_data.get('tags', recipe.tags)
-        recipe.tags.set(tags, clear=True)
-
-        ingredients = validated_data.get(
-            'ingredientamount', recipe.ingredients)
-        IngredientAmount.objects.filter(recipe=recipe).delete()
-        self._create_ingredientamount(ingredients, recipe)
+        """
+        Переопределение обновления рецепта.
+
+        Теги и ингредиенты изменяются по разнице с текущими,
+        у рецепта сохраняются только редактируемые поля,
+        чтобы не перезаписать счётчики.
+        """
+        if 'tags' in validated_data:
+            recipe.tags.set(validated_data['tags'])
+        if 'ingredientamount' in validated_data:
+            self._update_ingredientamount(
+                validated_data['ingredientamount'], recipe
+            )
 
-        recipe.image = validated_data.get(
-            'image', recipe.image)
-        recipe.name = validated_data.get(
-            'name', recipe.name)
-        recipe.text = validated_data.get(
-            'text', recipe.text)
-        recipe.cooking_time = validated_data.get(
-            'cooking_time', recipe.cooking_time)
+        update_fields = ['name', 'text', 'cooking_time']
+        for field in update_fields:
+            if field in validated_data:
+                setattr(recipe, field, validated_data[field])
+        if 'image' in validated_data:
+            recipe.image = validated_data['image']
+            delete_renditions(recipe)
+            update_fields += ['image', 'image_thumbnail', 'image_webp']
+            schedule_renditions(recipe)
+
+        recipe.save(update_fields=update_fields)
+        return recipe
 
-        recipe.save()
+    def save(self, **kwargs):
+        """Сохранение с закрытием временного файла изображения."""
+        recipe = super().save(**kwargs)
+        image = self.validated_data.get('image')
+        if isinstance(image, TemporaryUploadedFile):
+            image.close()
         return recipe
 
     def to_representation(self, recipe):
@@ -279,7 +479,7 @@ class SubscriptionSerializer(UserSerializer):
     """Сериалайзер для вывода подписки."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         """Метаданные пользователя."""
@@ -289,20 +489,17 @@ class SubscriptionSerializer(UserSerializer):
             'id', 'email', 'username', 'first_name', 'last_name',
             'is_subscribed', 'recipes', 'recipes_count',
         )
+        list_serializer_class = TimedListSerializer
 
     def get_recipes(self, author):
         """Получение рецептов автора."""
         request = self.context.get('request')
-        if request.GET.get('recipes_limit'):
-            recipes_limit = int(request.GET.get('recipes_limit'))
-            queryset = author.recipe.all()[:recipes_limit]
+        recipes_limit = request.GET.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            queryset = author.recipe.all()[:int(recipes_limit)]
         else:
             queryset = author.recipe.all()
         serializer = RecipeSimpleSerializer(
             queryset, read_only=True, many=True, context=self.context
         )
         return serializer.data
-
-    def get_recipes_count(self, author):
-        """Вычисление количества рецептов автора."""
-        return author.recipe.count()
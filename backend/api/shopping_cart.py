@@ -0,0 +1,88 @@
+"""
+Формирование файла списка покупок.
+
+Ингредиенты суммируются в базе данных, а файл отдаётся генератором
+по строкам. Строки читаются из базы порциями по SHOPPING_CART_CHUNK_SIZE,
+поэтому расход памяти растёт с числом разных ингредиентов только
+до размера порции, дальше от размера списка покупок он не зависит.
+"""
+import csv
+import json
+
+from django.db.models import Sum
+
+from recipes.models import IngredientAmount
+
+# Количество строк, читаемых из базы за раз. По умолчанию Django читает
+# по 2000 строк, и память под порцию занимала бы сотни килобайт.
+SHOPPING_CART_CHUNK_SIZE = 200
+
+
+class Echo:
+    """Псевдобуфер для csv.writer, который возвращает записанную строку."""
+
+    def write(self, value):
+        """Возврат строки вместо записи."""
+        return value
+
+
+def get_shopping_cart_ingredients(user):
+    """Суммарное количество ингредиентов из списка покупок пользователя."""
+    return IngredientAmount.objects.filter(
+        recipe__shoppingcartrecipe__user=user
+    ).values(
+        'ingredient__name',
+        'ingredient__measurement_unit'
+    ).annotate(
+        amount=Sum('amount')
+    ).order_by(
+        'ingredient__name',
+        'ingredient__measurement_unit'
+    )
+
+
+def stream_txt(user, ingredients):
+    """Список покупок в виде текста."""
+    yield f'Список покупок для {user.username}\n'
+    for ingredient in ingredients:
+        yield (
+            f'- {ingredient["ingredient__name"]}, '
+            f'{ingredient["ingredient__measurement_unit"]} - '
+            f'{ingredient["amount"]}\n'
+        )
+
+
+def stream_csv(user, ingredients):
+    """Список покупок в формате CSV."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['amount'],
+        ))
+
+
+def stream_json(user, ingredients):
+    """Список покупок в формате JSON."""
+    yield f'{{"user": {json.dumps(user.username)}, "ingredients": ['
+    separator = ''
+    for ingredient in ingredients:
+        yield separator + json.dumps(
+            {
+                'name': ingredient['ingredient__name'],
+                'measurement_unit': ingredient['ingredient__measurement_unit'],
+                'amount': ingredient['amount'],
+            },
+            ensure_ascii=False,
+        )
+        separator = ', '
+    yield ']}\n'
+
+
+SHOPPING_CART_FORMATS = {
+    'txt': stream_txt,
+    'csv': stream_csv,
+    'json': stream_json,
+}
@@ -0,0 +1,134 @@
+"""Сигналы приложения API."""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientAmount,
+                            Recipe, ShoppingCartRecipe, Tag)
+from recipes.signals import bulk_loaded
+from users.models import Subscription
+from .authentication import invalidate_token
+from .cache import bump_object_version, bump_version
+from .recipe_index import log_change
+from .relations import invalidate_relations
+
+User = get_user_model()
+
+CACHED_MODELS = (
+    Tag, Ingredient, Recipe, IngredientAmount,
+    FavoriteRecipe, ShoppingCartRecipe, Subscription, User,
+)
+
+
+# Поля, которые не попадают в ответы API: их сохранение,
+# например, last_login при входе, не сбрасывает кеш.
+UNCACHED_FIELDS = {'last_login'}
+
+
+def invalidate_cached_responses(sender, update_fields=None, **kwargs):
+    """
+    Обновление версии модели для кеша ответов после транзакции.
+
+    По версии ингредиентов также перестраивается индекс ингредиентов.
+    """
+    if update_fields is not None and update_fields <= UNCACHED_FIELDS:
+        return
+    transaction.on_commit(lambda: bump_version(sender))
+
+
+for model in CACHED_MODELS:
+    post_save.connect(invalidate_cached_responses, sender=model)
+    post_delete.connect(invalidate_cached_responses, sender=model)
+    bulk_loaded.connect(invalidate_cached_responses, sender=model)
+
+
+def invalidate_recipe_fragment(sender, instance, update_fields=None,
+                               **kwargs):
+    """
+    Обновление версии объекта для кеша представлений после транзакции.
+
+    Версия рецепта обновляется при изменении рецепта и количеств его
+    ингредиентов, версия пользователя — при изменении пользователя.
+    """
+    if update_fields is not None and update_fields <= UNCACHED_FIELDS:
+        return
+    if sender is IngredientAmount:
+        model, pk = Recipe, instance.recipe_id
+    else:
+        model, pk = sender, instance.pk
+    transaction.on_commit(lambda: bump_object_version(model, pk))
+
+
+post_save.connect(invalidate_recipe_fragment, sender=Recipe)
+post_save.connect(invalidate_recipe_fragment, sender=User)
+post_save.connect(invalidate_recipe_fragment, sender=IngredientAmount)
+post_delete.connect(invalidate_recipe_fragment, sender=IngredientAmount)
+
+
+def invalidate_user_relations(sender, instance, **kwargs):
+    """Сброс кеша связей пользователя после транзакции."""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_relations(user_id))
+
+
+for model in (FavoriteRecipe, ShoppingCartRecipe, Subscription):
+    post_save.connect(invalidate_user_relations, sender=model)
+    post_delete.connect(invalidate_user_relations, sender=model)
+
+
+# Поля рецепта, сохраняемые без изменения ингредиентов.
+UNINDEXED_FIELDS = {'image_webp', 'image_thumbnail'}
+
+
+def log_recipe_index_change(sender, instance, update_fields=None, **kwargs):
+    """
+    Запись в журнал индекса подбора после транзакции.
+
+    Количества ингредиентов создаются и изменяются массово без сигналов,
+    поэтому изменение отмечается при сохранении рецепта, а удаление —
+    по удалению количества ингредиента.
+    """
+    if update_fields is not None and update_fields <= UNINDEXED_FIELDS:
+        return
+    recipe_id = instance.pk if sender is Recipe else instance.recipe_id
+    transaction.on_commit(lambda: log_change(recipe_id))
+
+
+def rebuild_recipe_index(sender, **kwargs):
+    """Построение индекса подбора заново после массовой загрузки."""
+    transaction.on_commit(log_change)
+
+
+post_save.connect(log_recipe_index_change, sender=Recipe)
+post_delete.connect(log_recipe_index_change, sender=IngredientAmount)
+bulk_loaded.connect(rebuild_recipe_index, sender=IngredientAmount)
+
+
+def invalidate_cached_token(sender, instance, **kwargs):
+    """Сброс кеша токена после транзакции, например, при выходе."""
+    key = instance.key
+    transaction.on_commit(lambda: invalidate_token(key))
+
+
+post_save.connect(invalidate_cached_token, sender=Token)
+post_delete.connect(invalidate_cached_token, sender=Token)
+
+
+def invalidate_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """
+    Сброс кеша токенов пользователя после транзакции.
+
+    Вместе с токеном в кеше хранится пользователь, поэтому кеш
+    сбрасывается при любом его изменении, в том числе деактивации.
+    """
+    if update_fields is not None and update_fields <= UNCACHED_FIELDS:
+        return
+    keys = list(
+        Token.objects.filter(user_id=instance.pk).values_list('key', flat=True)
+    )
+    for key in keys:
+        transaction.on_commit(lambda key=key: invalidate_token(key))
+
+
+post_save.connect(invalidate_user_tokens, sender=User)
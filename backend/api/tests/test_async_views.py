@@ -0,0 +1,43 @@
+"""Тесты асинхронных представлений чтения."""
+import time
+from threading import Barrier, Thread
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api import async_views
+
+
+class ExecutorTest(SimpleTestCase):
+    """Пул потоков создаётся один раз."""
+
+    THREADS = 16
+
+    def test_concurrent_first_calls(self):
+        """Одновременные первые вызовы получают один пул."""
+        barrier = Barrier(self.THREADS)
+        executors = []
+
+        def get_executor():
+            barrier.wait()
+            executors.append(async_views.get_executor())
+
+        def create_executor(**kwargs):
+            # Создание пула занимает время, за которое успевают другие потоки.
+            time.sleep(0.01)
+            return object()
+
+        patch_class = mock.patch.object(
+            async_views, 'ThreadPoolExecutor', side_effect=create_executor
+        )
+        with mock.patch.object(async_views, '_executor', None):
+            with patch_class as executor_class:
+                threads = [
+                    Thread(target=get_executor) for _ in range(self.THREADS)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        self.assertEqual(executor_class.call_count, 1)
+        self.assertEqual(len({id(executor) for executor in executors}), 1)
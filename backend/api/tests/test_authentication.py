@@ -0,0 +1,73 @@
+"""Тесты кеша токенов."""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import (CachedTokenAuthentication, get_token_hash,
+                                invalidate_token, local_tokens)
+
+User = get_user_model()
+
+
+class CachedTokenTest(TestCase):
+    """Кеш токенов не возвращает сброшенные токены."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.org', username='user', password='password',
+            first_name='Имя', last_name='Фамилия',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.key = self.token.key
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.key}')
+
+    def forget_local(self):
+        """Сброс кеша процесса, как в другом процессе."""
+        local_tokens.delete(get_token_hash(self.key))
+
+    def test_cached(self):
+        """Повторная аутентификация без запросов к базе."""
+        self.client.get('/api/users/me/')
+        self.forget_local()
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_logout(self):
+        """После выхода токен не принимается."""
+        self.client.get('/api/users/me/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/auth/token/logout/')
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_invalidated_during_read(self):
+        """Токен, сброшенный во время чтения из базы, не попадает в кеш."""
+        read = CachedTokenAuthentication.get_model
+        calls = []
+
+        def invalidate_and_read(authentication):
+            # Выход в другом процессе между чтением поколения и из базы.
+            if not calls:
+                invalidate_token(self.key)
+            calls.append(authentication)
+            return read(authentication)
+
+        with mock.patch.object(
+            CachedTokenAuthentication, 'get_model', invalidate_and_read
+        ):
+            self.client.get('/api/users/me/')
+        self.token.delete()
+        self.forget_local()
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 401)
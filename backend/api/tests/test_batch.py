@@ -0,0 +1,87 @@
+"""Тесты пакетного добавления рецептов в избранное."""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.batch import find_targets
+from recipes.models import FavoriteRecipe, Recipe
+
+User = get_user_model()
+
+
+class FavoriteBatchTest(TestCase):
+    """Счётчики изменяются только на добавленные запросом связи."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.org', username='user', password='password',
+            first_name='Имя', last_name='Фамилия',
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.user, name=f'Рецепт {number}', text='Описание',
+                cooking_time=10, image='recipes/images/test.png',
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ids = [recipe.id for recipe in self.recipes]
+
+    def counts(self):
+        """Счётчики избранного рецептов."""
+        return list(
+            Recipe.objects.filter(pk__in=self.ids).order_by('pk').values_list(
+                'favorites_count', flat=True
+            )
+        )
+
+    def test_added_concurrently(self):
+        """Связь, добавленная после проверки, не учитывается второй раз."""
+        concurrent = self.recipes[0]
+
+        def find_and_add_concurrently(*args):
+            found = find_targets(*args)
+            if not FavoriteRecipe.objects.filter(recipe=concurrent).exists():
+                FavoriteRecipe.objects.create(
+                    user=self.user, recipe=concurrent
+                )
+                Recipe.objects.filter(pk=concurrent.pk).update(
+                    favorites_count=1
+                )
+            return found
+
+        with mock.patch(
+            'api.batch.find_targets', side_effect=find_and_add_concurrently
+        ):
+            response = self.client.post(
+                '/api/recipes/favorite/', {'ids': self.ids}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['exists', 'created', 'created'],
+        )
+        self.assertEqual(self.counts(), [1, 1, 1])
+        self.assertEqual(
+            FavoriteRecipe.objects.filter(user=self.user).count(), 3
+        )
+
+    def test_delete(self):
+        """Удаление уменьшает счётчики удалённых связей."""
+        self.client.post(
+            '/api/recipes/favorite/', {'ids': self.ids[:2]}, format='json'
+        )
+        response = self.client.delete(
+            '/api/recipes/favorite/', {'ids': self.ids}, format='json'
+        )
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['deleted', 'deleted', 'not_found'],
+        )
+        self.assertEqual(self.counts(), [0, 0, 0])
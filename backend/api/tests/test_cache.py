@@ -0,0 +1,38 @@
+"""Тесты версий кеша ответов."""
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Tag
+
+
+class VersionTimeoutTest(TestCase):
+    """Версии не истекают вместе с кешем ответов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_etag_is_stable(self):
+        """Без изменений ETag не меняется после срока хранения ответов."""
+        etag = self.client.get('/api/tags/')['ETag']
+        later = time.time() + settings.API_CACHE_TIMEOUT * 10
+        with mock.patch('time.time', return_value=later):
+            response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_updates_etag(self):
+        """Изменение тега меняет ETag."""
+        etag = self.client.get('/api/tags/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='Обед', color='#49B64E', slug='lunch')
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,45 @@
+"""Тесты поля изображения в base64."""
+from base64 import b64encode, encodebytes
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from ..serializers import Base64ImageField
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+    """Изображение декодируется по частям так же, как целиком."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        image = Image.effect_noise((300, 300), 64).convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, 'PNG')
+        cls.image = buffer.getvalue()
+
+    def decode(self, text):
+        """Содержимое файла из поля."""
+        field = Base64ImageField()
+        field.chunk_size = 1000
+        return field.to_internal_value(
+            'data:image/png;base64,' + text
+        ).read()
+
+    def test_line_wrapped(self):
+        """Переносы строк не нарушают выравнивание частей."""
+        text = encodebytes(self.image).decode()
+        for name, value in (
+            ('без переносов', b64encode(self.image).decode()),
+            ('LF', text),
+            ('CRLF', text.replace('\n', '\r\n')),
+        ):
+            with self.subTest(name):
+                self.assertEqual(self.decode(value), self.image)
+
+    def test_truncated(self):
+        """Обрезанная строка — ошибка проверки, а не файл."""
+        with self.assertRaises(ValidationError):
+            self.decode(b64encode(self.image).decode()[:-1])
@@ -0,0 +1,107 @@
+"""Тесты индекса подбора рецептов по ингредиентам."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.models import Ingredient, IngredientAmount, Recipe
+from ..recipe_index import RecipeIngredientIndex
+
+User = get_user_model()
+
+
+class RecipeIndexTest(TestCase):
+    """Индекс обновляется по журналу изменений без построения заново."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.org', username='author',
+            password='password', first_name='Имя', last_name='Фамилия',
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.index = RecipeIngredientIndex()
+        self.builds = 0
+        build = self.index._build
+
+        def counted_build():
+            self.builds += 1
+            return build()
+
+        self.index._build = counted_build
+
+    def create_recipe(self, ingredients):
+        """Рецепт с ингредиентами, запись в журнал после транзакции."""
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.author, name='Рецепт', text='Описание',
+                cooking_time=10, image='recipes/images/test.png',
+            )
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(
+                    recipe=recipe, ingredient=ingredient, amount=10
+                )
+                for ingredient in ingredients
+            )
+        return recipe
+
+    def test_changes_are_patched(self):
+        """Создание, изменение и удаление рецепта применяются к индексу."""
+        first, second, third, fourth = self.ingredients
+        recipe = self.create_recipe((first, second))
+        self.assertEqual(
+            self.index.match([first.id, second.id]), [(recipe.id, 2, 0)]
+        )
+
+        other = self.create_recipe((first, third))
+        self.assertEqual(
+            self.index.match([first.id], max_missing=1),
+            [(other.id, 1, 1), (recipe.id, 1, 1)],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientAmount.objects.filter(
+                recipe=recipe, ingredient=second
+            ).delete()
+            IngredientAmount.objects.create(
+                recipe=recipe, ingredient=fourth, amount=5
+            )
+            recipe.save()
+        self.assertEqual(
+            self.index.match([first.id, fourth.id]), [(recipe.id, 2, 0)]
+        )
+        self.assertEqual(self.index.match([second.id], max_missing=5), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual(self.index.match([third.id], max_missing=5), [])
+        self.assertEqual(self.builds, 1)
+
+    def test_rendition_save_is_not_logged(self):
+        """Сохранение изображений рецепта не меняет индекс."""
+        recipe = self.create_recipe(self.ingredients[:1])
+        self.index.match([self.ingredients[0].id])
+        state = self.index._state
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save(update_fields=('image_webp', 'image_thumbnail'))
+        self.index.match([self.ingredients[0].id])
+        self.assertIs(self.index._state, state)
+
+    def test_patch_keeps_previous_data(self):
+        """Подбор по прежним данным не видит изменений во время обновления."""
+        recipe = self.create_recipe(self.ingredients[:2])
+        self.index.match([self.ingredients[0].id])
+        _, (recipes, sizes) = self.index._state
+        previous = (dict(recipes), dict(sizes))
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.index.match([self.ingredients[0].id])
+        self.assertEqual((dict(recipes), dict(sizes)), previous)
+        self.assertEqual(self.builds, 1)
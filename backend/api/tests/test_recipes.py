@@ -0,0 +1,252 @@
+"""Тесты количества запросов к базе в API рецептов."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientAmount,
+                            Recipe, ShoppingCartRecipe, Tag)
+from users.models import Subscription
+
+User = get_user_model()
+
+WRITE_STATEMENTS = {'INSERT', 'UPDATE', 'DELETE'}
+
+
+def create_recipes(author, count, tags, ingredients):
+    """Рецепты автора с тегами и ингредиентами."""
+    recipes = [
+        Recipe.objects.create(
+            author=author, name=f'Рецепт {number}', text='Описание',
+            cooking_time=number % 60 + 1, image='recipes/images/test.png',
+        )
+        for number in range(count)
+    ]
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tag)
+        for recipe in recipes for tag in tags
+    )
+    IngredientAmount.objects.bulk_create(
+        IngredientAmount(recipe=recipe, ingredient=ingredient, amount=10)
+        for recipe in recipes for ingredient in ingredients
+    )
+    return recipes
+
+
+class RecipeListQueriesTest(TestCase):
+    """Количество запросов в списке рецептов не зависит от его размера."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.org', username='user', password='password',
+            first_name='Имя', last_name='Фамилия',
+        )
+        authors = [
+            User.objects.create_user(
+                email=f'author{number}@example.org',
+                username=f'author{number}', password='password',
+                first_name='Имя', last_name='Фамилия',
+            )
+            for number in range(4)
+        ]
+        tags = [
+            Tag.objects.create(
+                name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag{number}',
+            )
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(5)
+        ]
+        recipes = []
+        for author in authors:
+            recipes += create_recipes(author, 30, tags, ingredients)
+        FavoriteRecipe.objects.bulk_create(
+            FavoriteRecipe(user=cls.user, recipe=recipe)
+            for recipe in recipes[::2]
+        )
+        ShoppingCartRecipe.objects.bulk_create(
+            ShoppingCartRecipe(user=cls.user, recipe=recipe)
+            for recipe in recipes[::3]
+        )
+        Subscription.objects.create(user=cls.user, author=authors[0])
+        cls.recipe = recipes[0]
+
+    def setUp(self):
+        cache.clear()
+        self.anonymous_client = APIClient()
+        self.user_client = APIClient()
+        self.user_client.force_authenticate(self.user)
+
+    def test_list_queries(self):
+        """
+        Список: COUNT, рецепты с авторами, теги, ингредиенты
+        и для пользователя его связи с рецептами и авторами.
+        """
+        cases = (
+            ('аноним', self.anonymous_client, 4),
+            ('пользователь', self.user_client, 5),
+        )
+        for name, client, queries in cases:
+            for limit in (6, 100):
+                with self.subTest(client=name, limit=limit):
+                    cache.clear()
+                    with self.assertNumQueries(queries):
+                        response = client.get(
+                            '/api/recipes/', {'limit': limit}
+                        )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.data['results']), limit)
+
+    def test_detail_queries(self):
+        """Рецепт: рецепт с автором, теги, ингредиенты и связи."""
+        cases = (
+            ('аноним', self.anonymous_client, 3),
+            ('пользователь', self.user_client, 4),
+        )
+        for name, client, queries in cases:
+            with self.subTest(client=name):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    response = client.get(f'/api/recipes/{self.recipe.id}/')
+                self.assertEqual(response.status_code, 200)
+
+    def test_user_statuses(self):
+        """Статусы пользователя берутся из его связей."""
+        response = self.user_client.get('/api/recipes/', {'limit': 100})
+        statuses = {
+            recipe['id']: (
+                recipe['is_favorited'],
+                recipe['is_in_shopping_cart'],
+                recipe['author']['is_subscribed'],
+            )
+            for recipe in response.data['results']
+        }
+        favorites = set(FavoriteRecipe.objects.filter(
+            user=self.user
+        ).values_list('recipe_id', flat=True))
+        cart = set(ShoppingCartRecipe.objects.filter(
+            user=self.user
+        ).values_list('recipe_id', flat=True))
+        authors = set(Subscription.objects.filter(
+            user=self.user
+        ).values_list('author_id', flat=True))
+        for recipe in Recipe.objects.filter(id__in=statuses):
+            self.assertEqual(statuses[recipe.id], (
+                recipe.id in favorites,
+                recipe.id in cart,
+                recipe.author_id in authors,
+            ))
+
+
+class RecipeUpdateQueriesTest(TestCase):
+    """Редактирование рецепта изменяет только отличающиеся строки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.org', username='author',
+            password='password', first_name='Имя', last_name='Фамилия',
+        )
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag{number}',
+            )
+            for number in range(4)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.recipe, = create_recipes(
+            self.author, 1, self.tags[:2], self.ingredients[:3]
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def get_data(self, tags=None, amounts=None):
+        """Данные рецепта с тегами и количествами ингредиентов."""
+        if tags is None:
+            tags = self.tags[:2]
+        if amounts is None:
+            amounts = {ingredient: 10 for ingredient in self.ingredients[:3]}
+        return {
+            'name': self.recipe.name,
+            'text': self.recipe.text,
+            'cooking_time': self.recipe.cooking_time,
+            'tags': [tag.id for tag in tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient, amount in amounts.items()
+            ],
+        }
+
+    def count_writes(self, data):
+        """Количество изменяющих запросов при редактировании рецепта."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.id}/', data, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        return sum(
+            query['sql'].lstrip().split(' ', 1)[0].upper() in WRITE_STATEMENTS
+            for query in context.captured_queries
+        )
+
+    def assert_contents(self, tags, amounts):
+        """Теги и количества ингредиентов рецепта в базе."""
+        self.assertEqual(
+            set(self.recipe.tags.values_list('id', flat=True)),
+            {tag.id for tag in tags},
+        )
+        self.assertEqual(
+            dict(IngredientAmount.objects.filter(
+                recipe=self.recipe
+            ).values_list('ingredient_id', 'amount')),
+            {
+                ingredient.id: amount
+                for ingredient, amount in amounts.items()
+            },
+        )
+
+    def test_unchanged(self):
+        """Без изменений сохраняется только рецепт."""
+        self.assertEqual(self.count_writes(self.get_data()), 1)
+
+    def test_amount_changed(self):
+        """Изменённое количество обновляется одним запросом."""
+        amounts = {ingredient: 10 for ingredient in self.ingredients[:3]}
+        amounts[self.ingredients[0]] = 25
+        self.assertEqual(
+            self.count_writes(self.get_data(amounts=amounts)), 2
+        )
+        self.assert_contents(self.tags[:2], amounts)
+
+    def test_ingredient_removed(self):
+        """Убранный ингредиент удаляется одним запросом."""
+        amounts = {ingredient: 10 for ingredient in self.ingredients[:2]}
+        self.assertEqual(
+            self.count_writes(self.get_data(amounts=amounts)), 2
+        )
+        self.assert_contents(self.tags[:2], amounts)
+
+    def test_tags_replaced(self):
+        """Замена тегов: удаление старых и вставка новых."""
+        tags = self.tags[2:]
+        self.assertEqual(self.count_writes(self.get_data(tags=tags)), 3)
+        self.assert_contents(
+            tags, {ingredient: 10 for ingredient in self.ingredients[:3]}
+        )
@@ -0,0 +1,43 @@
+"""Тесты рендерера JSON на orjson."""
+import datetime
+import unittest
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer, orjson
+
+
+@unittest.skipIf(orjson is None, 'orjson не установлен.')
+class FastJSONRendererTest(SimpleTestCase):
+    """Ответы FastJSONRenderer совпадают с JSONRenderer."""
+
+    def test_same_content(self):
+        """Строки, числа, даты и Decimal записываются одинаково."""
+        data = {
+            'results': [
+                {
+                    'id': 2 ** 40,
+                    'name': 'Борщ "по-домашнему"  \n',
+                    'tags': [],
+                    'is_favorited': False,
+                    'image': None,
+                    'amount': Decimal('1.50'),
+                    'added': datetime.datetime(
+                        2026, 10, 18, 12, 30, tzinfo=datetime.timezone.utc
+                    ),
+                },
+            ],
+            'next': None,
+        }
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_fallback(self):
+        """Целые числа больше 64 бит записывает JSONRenderer."""
+        data = {'id': 2 ** 70}
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
@@ -0,0 +1,124 @@
+"""Тесты чтения из реплик."""
+import time
+import warnings
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.cache import get_versions
+from api.replicas import ReplicaRouter, can_cache, read_database
+from recipes.models import Recipe
+
+User = get_user_model()
+
+REPLICA = 'replica'
+PIN_SECONDS = 1
+
+
+class ReplicaRoutingTest(TransactionTestCase):
+    """
+    Маршрутизация чтения между основной базой и репликой.
+
+    Реплика — второе подключение к тестовой базе, а не зеркало: запросы
+    к ней видны в CaptureQueriesContext отдельно от основной базы.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        replica = dict(connections[DEFAULT_DB_ALIAS].settings_dict)
+        cls._replica_settings = override_settings(
+            DATABASES={**settings.DATABASES, REPLICA: replica},
+            DATABASE_REPLICAS=[REPLICA],
+            DATABASE_REPLICA_PIN_SECONDS=PIN_SECONDS,
+        )
+        with warnings.catch_warnings():
+            # Новая база подключается ниже вручную.
+            warnings.simplefilter('ignore', UserWarning)
+            cls._replica_settings.enable()
+        # Подключения настраиваются один раз, override_settings
+        # не добавляет в них новую базу. Реплика добавляется после
+        # настройки класса, чтобы запросы к ней не считались запрещёнными.
+        connections.settings[REPLICA] = replica
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        cls._replica_settings.disable()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.org', username='user', password='password',
+            first_name='Имя', last_name='Фамилия',
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Рецепт', text='Описание',
+            cooking_time=10, image='recipes/images/test.png',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_databases(self, client):
+        """Базы, из которых читал запрос списка рецептов."""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as default:
+            with CaptureQueriesContext(connections[REPLICA]) as replica:
+                response = client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return {
+            alias
+            for alias, context in (
+                (DEFAULT_DB_ALIAS, default), (REPLICA, replica),
+            )
+            if context.captured_queries
+        }
+
+    def test_router(self):
+        """Чтение идёт в базу запроса, запись — в основную."""
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Recipe))
+        token = read_database.set(REPLICA)
+        try:
+            self.assertEqual(router.db_for_read(Recipe), REPLICA)
+            self.assertEqual(router.db_for_write(Recipe), DEFAULT_DB_ALIAS)
+        finally:
+            read_database.reset(token)
+
+    def test_anonymous_reads_replica(self):
+        """Анонимный GET читает только из реплики."""
+        self.assertEqual(self.get_databases(APIClient()), {REPLICA})
+
+    def test_pinned_after_write(self):
+        """После изменения пользователь читает из основной базы."""
+        # Связи пользователя загружаются из основной базы и кешируются.
+        self.get_databases(self.client)
+        self.assertEqual(self.get_databases(self.client), {REPLICA})
+        response = self.client.post(
+            f'/api/recipes/{self.recipe.id}/favorite/'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.get_databases(self.client), {DEFAULT_DB_ALIAS})
+        self.assertEqual(self.get_databases(APIClient()), {REPLICA})
+        time.sleep(PIN_SECONDS + 0.1)
+        self.assertEqual(self.get_databases(self.client), {REPLICA})
+
+    def test_can_cache_while_pinned(self):
+        """Прочитанное из реплики после изменения не кешируется."""
+        self.client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        versions = get_versions((Recipe,))
+        self.assertTrue(can_cache(versions))
+        token = read_database.set(REPLICA)
+        try:
+            self.assertFalse(can_cache(versions))
+            time.sleep(PIN_SECONDS + 0.1)
+            self.assertTrue(can_cache(versions))
+        finally:
+            read_database.reset(token)
@@ -0,0 +1,88 @@
+"""Тесты количества запросов к базе в списке подписок."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def create_user(name):
+    """Пользователь с именем name."""
+    return User.objects.create_user(
+        email=f'{name}@example.org', username=name, password='password',
+        first_name='Имя', last_name='Фамилия',
+    )
+
+
+class SubscriptionListQueriesTest(TestCase):
+    """Количество запросов в списке подписок не зависит от числа авторов."""
+
+    RECIPES_PER_AUTHOR = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = [create_user(f'author{number}') for number in range(10)]
+        for author in authors:
+            for number in range(cls.RECIPES_PER_AUTHOR):
+                Recipe.objects.create(
+                    author=author, name=f'Рецепт {number}', text='Описание',
+                    cooking_time=10, image='recipes/images/test.png',
+                )
+        User.objects.filter(pk__in=[author.pk for author in authors]).update(
+            recipes_count=cls.RECIPES_PER_AUTHOR
+        )
+        cls.followers = {}
+        for follows in (1, len(authors)):
+            follower = create_user(f'follower{follows}')
+            Subscription.objects.bulk_create(
+                Subscription(user=follower, author=author)
+                for author in authors[:follows]
+            )
+            cls.followers[follows] = follower
+
+    def test_queries(self):
+        """COUNT, авторы и рецепты всех авторов одним запросом."""
+        for follows, follower in self.followers.items():
+            client = APIClient()
+            client.force_authenticate(follower)
+            for limit in (None, 2):
+                with self.subTest(follows=follows, recipes_limit=limit):
+                    params = {'limit': 100}
+                    if limit is not None:
+                        params['recipes_limit'] = limit
+                    cache.clear()
+                    with self.assertNumQueries(3):
+                        response = client.get(
+                            '/api/users/subscriptions/', params
+                        )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.data['results']), follows)
+
+    def test_recipes_limit(self):
+        """Рецепты ограничиваются recipes_limit у каждого автора."""
+        client = APIClient()
+        client.force_authenticate(self.followers[10])
+        for recipes_limit, expected in (
+            (None, self.RECIPES_PER_AUTHOR), (2, 2), (0, 0),
+        ):
+            with self.subTest(recipes_limit=recipes_limit):
+                params = {'limit': 100}
+                if recipes_limit is not None:
+                    params['recipes_limit'] = recipes_limit
+                response = client.get('/api/users/subscriptions/', params)
+                for author in response.data['results']:
+                    self.assertEqual(len(author['recipes']), expected)
+                    self.assertEqual(
+                        author['recipes_count'], self.RECIPES_PER_AUTHOR
+                    )
+                    self.assertTrue(author['is_subscribed'])
+                    self.assertLessEqual(
+                        {recipe['id'] for recipe in author['recipes']},
+                        set(Recipe.objects.filter(
+                            author_id=author['id']
+                        ).values_list('id', flat=True)),
+                    )
@@ -1,9 +1,11 @@
 """URL приложения API."""
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
-                    SubscriptionViewSet, TagViewSet)
+from .async_views import async_read_urls
+from .views import (CustomUserViewSet, IngredientViewSet, MetricsView,
+                    RecipeViewSet, SubscriptionViewSet, TagViewSet)
 
 app_name = 'api'
 
@@ -19,7 +21,19 @@ router.register(
 )
 router.register('users', CustomUserViewSet, basename='user')
 
+# Просмотр рецептов, тегов и ингредиентов под ASGI.
+ASYNC_READ_VIEWS = (
+    'recipe-list', 'recipe-detail',
+    'ingredient-list', 'ingredient-detail',
+    'tag-list', 'tag-detail',
+)
+
+router_urls = router.urls
+if settings.API_ASYNC_VIEWS:
+    router_urls = async_read_urls(router_urls, ASYNC_READ_VIEWS)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('', include(router_urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,27 +1,48 @@
 """Вьюсеты приложения API."""
+from itertools import chain
+
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
-from django.shortcuts import get_list_or_404, get_object_or_404
+from django.db import transaction
+from django.db.models import OuterRef, Prefetch, Subquery, Value
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.mixins import ListModelMixin
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import (GenericViewSet, ModelViewSet,
                                      ReadOnlyModelViewSet)
 
+from recipes.counters import (change_cart, change_counters, change_favorites,
+                              change_followers)
 from recipes.models import (FavoriteRecipe, Ingredient, IngredientAmount,
                             Recipe, ShoppingCartRecipe, Tag)
+from recipes.search import add_headlines
 from users.models import Subscription
+from .batch import add_relations, delete_relations
+from .cache import CachedResponseMixin
+from .feed import get_feed
 from .filters import IngredientFilter, RecipeFilter
+from .ingredient_index import ingredient_index
+from .middleware import metrics
+from .pagination import (CursorLimitPagination, PageLimitPagination,
+                         PageOrCursorPagination)
 from .permissions import IsAuthorOrReadOnly
-from .serializers import (IngredientSerializer, RecipeCUSerializer,
+from .recipe_index import recipe_index
+from .renderers import CSVRenderer, PlainTextRenderer
+from .replicas import ReplicaReadMixin
+from .serializers import (BatchSerializer, IngredientSerializer,
+                          RecipeCUSerializer, RecipeMatchSerializer,
                           RecipeSerializer, RecipeSimpleSerializer,
                           SubscriptionSerializer, TagSerializer)
+from .shopping_cart import (SHOPPING_CART_CHUNK_SIZE, SHOPPING_CART_FORMATS,
+                            get_shopping_cart_ingredients)
 
 User = get_user_model()
 
@@ -30,13 +51,15 @@ User = get_user_model()
 #
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(ReplicaReadMixin, UserViewSet):
     """
     Вьюсет пользователя.
 
-    Унаследован от djoser.views.UserViewSet
+    Унаследован от djoser.views.UserViewSet. Читает из основной базы,
+    после подписки чтения пользователя закрепляются за ней.
     """
 
+    replica_reads = False
     queryset = User.objects.all()
 
     @action(
@@ -57,6 +80,7 @@ class CustomUserViewSet(UserViewSet):
         url_name='subscribe',
         permission_classes=[IsAuthenticated, ]
     )
+    @transaction.atomic
     def get_subscribe(self, request, id):
         """Подписка на пользователей."""
         author = get_object_or_404(User, id=id)
@@ -77,6 +101,8 @@ class CustomUserViewSet(UserViewSet):
                     {'error': 'Запись уже существует.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            change_followers([author.pk], 1)
+            author.is_subscribed = True
             serializer = SubscriptionSerializer(
                 author, context={'request': request}
             )
@@ -87,51 +113,143 @@ class CustomUserViewSet(UserViewSet):
                 {'error': 'Запись уже была удалена.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        user.subscriber.filter(author=author).delete()
+        deleted, _ = user.subscriber.filter(author=author).delete()
+        change_followers([author.pk], -deleted)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        methods=['post', 'delete', ],
+        detail=False,
+        url_path='subscribe',
+        url_name='subscribe_batch',
+        permission_classes=[IsAuthenticated, ]
+    )
+    @transaction.atomic
+    def get_subscribe_batch(self, request):
+        """
+        Пакетная подписка на пользователей и отписка от них.
+
+        Подписка на самого себя не создаётся, пользователь
+        считается не найденным.
+        """
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        user = request.user
+        if request.method == 'POST':
+            results = add_relations(
+                user, Subscription, 'author',
+                User.objects.exclude(pk=user.pk), ids, change_followers,
+            )
+        else:
+            results = delete_relations(
+                user, Subscription, 'author', ids, change_followers
+            )
+        return Response({'results': results})
+
 
-class SubscriptionViewSet(ListModelMixin, GenericViewSet):
+class SubscriptionViewSet(ReplicaReadMixin, ListModelMixin, GenericViewSet):
     """Вьюсет списка подписки на авторов."""
 
     serializer_class = SubscriptionSerializer
     permission_classes = [IsAuthenticated, ]
 
     def get_queryset(self):
-        """Собираем список подписки на авторов."""
-        return get_list_or_404(User, author__user=self.request.user)
+        """
+        Собираем список подписки на авторов.
+
+        Количество рецептов хранится в поле автора, а рецепты авторов
+        подгружаются одним запросом с ограничением recipes_limit
+        на каждого автора.
+        """
+        recipes = Recipe.objects.all()
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.filter(
+                id__in=Subquery(
+                    Recipe.objects.filter(
+                        author=OuterRef('author')
+                    ).values('id')[:int(recipes_limit)]
+                )
+            )
+        return User.objects.filter(
+            author__user=self.request.user
+        ).annotate(
+            is_subscribed=Value(True),
+        ).prefetch_related(
+            Prefetch('recipe', queryset=recipes)
+        ).order_by('email')
 
 #
 # Вьюсеты по работе с рецептом.
 #
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(
+    ReplicaReadMixin, CachedResponseMixin, ReadOnlyModelViewSet
+):
     """Вьюсет тега."""
 
+    cache_models = (Tag,)
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ReplicaReadMixin, CachedResponseMixin, ReadOnlyModelViewSet
+):
     """Вьюсет ингредиента."""
 
+    cache_models = (Ingredient,)
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Поиск по названию ведётся по индексу без запросов к базе."""
+        if not request.query_params.get('name'):
+            return super().list(request, *args, **kwargs)
+        return self.get_cached_response(
+            self._search, request, *args, **kwargs
+        )
+
+    def _search(self, request, *args, **kwargs):
+        """Поиск ингредиентов по индексу."""
+        return Response(ingredient_index.search(request.query_params['name']))
 
-class RecipeViewSet(ModelViewSet):
+
+class RecipeViewSet(ReplicaReadMixin, CachedResponseMixin, ModelViewSet):
     """Вьюсет рецепта."""
 
+    cache_models = (
+        Recipe, IngredientAmount, Tag, Ingredient, User,
+        FavoriteRecipe, ShoppingCartRecipe, Subscription,
+    )
+    cache_actions = ('retrieve',)
+    cache_per_user = True
     queryset = Recipe.objects.all()
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    pagination_class = PageOrCursorPagination
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly,)
 
+    def get_queryset(self):
+        """Рецепты с данными для просмотра."""
+        if self.action in ('list', 'retrieve'):
+            return Recipe.objects.with_related()
+        return super().get_queryset()
+
+    def paginate_queryset(self, queryset):
+        """Страница рецептов, при поиске — с фрагментами описания."""
+        page = super().paginate_queryset(queryset)
+        text = self.request.query_params.get('search')
+        if page is None or not text:
+            return page
+        return add_headlines(page, text)
+
     def get_serializer_class(self):
         """Выбор сериалайзера для рецепта."""
         if self.action in ('list', 'retrieve'):
@@ -146,6 +264,14 @@ class RecipeViewSet(ModelViewSet):
         """При обновлении сохраняем."""
         serializer.save()
 
+    @transaction.atomic
+    def perform_destroy(self, recipe):
+        """При удалении уменьшаем количество рецептов автора."""
+        recipe.delete()
+        change_counters(
+            User.objects.filter(pk=recipe.author_id), recipes_count=-1
+        )
+
     @action(
         methods=['post', 'delete', ],
         detail=True,
@@ -153,6 +279,7 @@ class RecipeViewSet(ModelViewSet):
         url_name='favorite',
         permission_classes=[IsAuthenticated, ]
     )
+    @transaction.atomic
     def get_favorite(self, request, pk):
         """Добавление рецептов в избранное."""
         if not Recipe.objects.filter(id=pk).exists():
@@ -177,6 +304,7 @@ class RecipeViewSet(ModelViewSet):
                     {'error': 'Запись уже существует.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            change_favorites([recipe.pk], 1)
             serializer = RecipeSimpleSerializer(
                 recipe, context={'request': request}
             )
@@ -187,7 +315,8 @@ class RecipeViewSet(ModelViewSet):
                 {'error': 'Запись уже была удалена.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        user.favoriterecipe.filter(recipe=recipe).delete()
+        deleted, _ = user.favoriterecipe.filter(recipe=recipe).delete()
+        change_favorites([recipe.pk], -deleted)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -197,6 +326,7 @@ class RecipeViewSet(ModelViewSet):
         url_name='shopping_cart',
         permission_classes=[IsAuthenticated, ]
     )
+    @transaction.atomic
     def get_shopping_cart(self, request, pk):
         """Добавление рецептов в список покупок."""
         if not Recipe.objects.filter(id=pk).exists():
@@ -221,6 +351,7 @@ class RecipeViewSet(ModelViewSet):
                     {'error': 'Запись уже существует.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            change_cart([recipe.pk], 1)
             serializer = RecipeSimpleSerializer(
                 recipe, context={'request': request}
             )
@@ -231,40 +362,167 @@ class RecipeViewSet(ModelViewSet):
                 {'error': 'Запись уже была удалена.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        user.shoppingcartrecipe.filter(recipe=recipe).delete()
+        deleted, _ = user.shoppingcartrecipe.filter(recipe=recipe).delete()
+        change_cart([recipe.pk], -deleted)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        methods=['post', 'delete', ],
+        detail=False,
+        url_path='favorite',
+        url_name='favorite_batch',
+        permission_classes=[IsAuthenticated, ]
+    )
+    @transaction.atomic
+    def get_favorite_batch(self, request):
+        """Пакетное добавление рецептов в избранное и удаление из него."""
+        return self._change_relations(
+            request, FavoriteRecipe, change_favorites
+        )
+
+    @action(
+        methods=['post', 'delete', ],
+        detail=False,
+        url_path='shopping_cart',
+        url_name='shopping_cart_batch',
+        permission_classes=[IsAuthenticated, ]
+    )
+    @transaction.atomic
+    def get_shopping_cart_batch(self, request):
+        """Пакетное добавление рецептов в список покупок и удаление."""
+        return self._change_relations(
+            request, ShoppingCartRecipe, change_cart
+        )
+
+    def _change_relations(self, request, model, change_counter):
+        """Пакетное изменение связей пользователя с рецептами."""
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        if request.method == 'POST':
+            results = add_relations(
+                request.user, model, 'recipe', Recipe.objects.all(), ids,
+                change_counter,
+            )
+        else:
+            results = delete_relations(
+                request.user, model, 'recipe', ids, change_counter
+            )
+        return Response({'results': results})
+
+    @action(
+        methods=['get', ],
+        detail=False,
+        url_path='match',
+        url_name='match',
+    )
+    def get_match(self, request):
+        """
+        Подбор рецептов по имеющимся ингредиентам.
+
+        Идентификаторы ингредиентов передаются параметрами ingredients,
+        допустимое количество недостающих — параметром max_missing.
+        Рецепты подбираются по индексу в памяти, из базы загружается
+        только страница найденных рецептов.
+        """
+        params = RecipeMatchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        found = recipe_index.match(
+            params.validated_data['ingredients'],
+            params.validated_data['max_missing'],
+        )
+        paginator = PageLimitPagination()
+        page = paginator.paginate_queryset(found, request, view=self)
+        recipes = Recipe.objects.with_related().in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
+        )
+        matches = []
+        for recipe_id, matched, missing in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.matched_ingredients = matched
+            recipe.missing_ingredients = missing
+            matches.append(recipe)
+        serializer = RecipeSerializer(
+            matches, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        methods=['get', ],
+        detail=False,
+        url_path='feed',
+        url_name='feed',
+        permission_classes=(IsAuthenticated,),
+    )
+    def get_feed(self, request):
+        """
+        Лента рецептов авторов, на которых подписан пользователь.
+
+        Рецепты отдаются от новых к старым с пагинацией по курсору.
+        """
+        paginator = CursorLimitPagination()
+        recipes = get_feed(
+            request,
+            paginator.get_page_size(request),
+            paginator.cursor_query_param not in request.query_params,
+        )
+        page = paginator.paginate_queryset(
+            recipes.with_related(), request, view=self
+        )
+        serializer = RecipeSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
     @action(
         methods=['get', ],
         detail=False,
         url_path='download_shopping_cart',
         url_name='download_shopping_cart',
-        permission_classes=[IsAuthenticated, ]
+        permission_classes=[IsAuthenticated, ],
+        renderer_classes=[PlainTextRenderer, CSVRenderer, JSONRenderer, ],
     )
     def get_download_shopping_cart(self, request):
-        """Скачивание списка покупок."""
+        """
+        Скачивание списка покупок.
+
+        Формат файла выбирается параметром format (txt, csv, json)
+        или заголовком Accept, по умолчанию txt.
+        """
         user = request.user
-        if not user.shoppingcartrecipe.exists():
+        ingredients = get_shopping_cart_ingredients(user).iterator(
+            chunk_size=SHOPPING_CART_CHUNK_SIZE
+        )
+        first = next(ingredients, None)
+        if first is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
-        ingredients = IngredientAmount.objects.filter(
-            recipe__shoppingcartrecipe__user=user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
-
-        cart = f'Список покупок для {user.username}\n'
-        for ingredient in ingredients:
-            cart += (
-                f'- {ingredient["ingredient__name"]}, '
-                f'{ingredient["ingredient__measurement_unit"]} - '
-                f'{ingredient["amount"]}\n'
-            )
-
-        return HttpResponse(
-            cart, headers={
-                'Content-Type': 'text/plain',
-                'Content-Disposition': 'attachment; filename="cart.txt"',
+        renderer = request.accepted_renderer
+        return StreamingHttpResponse(
+            SHOPPING_CART_FORMATS[renderer.format](
+                user, chain((first,), ingredients)
+            ),
+            headers={
+                'Content-Type': f'{renderer.media_type}; charset=utf-8',
+                'Content-Disposition': (
+                    f'attachment; filename="cart.{renderer.format}"'
+                ),
             }
         )
+
+#
+# Служебные представления.
+#
+
+
+class MetricsView(APIView):
+    """Метрики запросов в формате Prometheus."""
+
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (PlainTextRenderer,)
+
+    def get(self, request):
+        """Выдача накопленных метрик."""
+        return Response(metrics.render())
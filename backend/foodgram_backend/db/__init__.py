@@ -0,0 +1 @@
+"""Бэкенд PostgreSQL с проверкой и пулом соединений."""
@@ -0,0 +1,188 @@
+"""
+Бэкенд PostgreSQL с проверкой и пулом соединений.
+
+Django 3.2 переиспользует постоянные соединения (CONN_MAX_AGE) без
+проверки: если соединение закрыто сервером или балансировщиком, первый
+запрос к базе завершается ошибкой. С CONN_HEALTH_CHECKS, как в Django 4.1,
+переиспользуемое соединение проверяется запросом SELECT 1 перед первым
+запросом к базе в каждом запросе к API и при ошибке открывается заново.
+
+С POOL_SIZE больше нуля соединения хранятся в общем пуле процесса:
+соединение берётся из пула при первом запросе к базе и возвращается
+в конце запроса к API, так что все потоки процесса, например, потоки
+асинхронных представлений, используют не больше POOL_SIZE соединений.
+Если свободных соединений нет, поток ждёт не дольше POOL_TIMEOUT секунд.
+"""
+import os
+import time
+from contextlib import suppress
+from functools import partial
+from threading import BoundedSemaphore, Lock
+
+from django.db.backends.postgresql import base
+
+_pools = {}
+_pools_lock = Lock()
+
+
+class ConnectionPool:
+    """Пул соединений с базой, общий для потоков процесса."""
+
+    def __init__(self, size, timeout):
+        """Пустой пул из size соединений."""
+        self.timeout = timeout
+        self._slots = BoundedSemaphore(size)
+        self._idle = []
+        self._lock = Lock()
+
+    def acquire(self, connect, check=None):
+        """
+        Свободное соединение из пула или новое соединение.
+
+        Если задана проверка check, непрошедшие её соединения закрываются.
+        Возвращает None, если за timeout секунд соединение не освободилось.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            return None
+        try:
+            while True:
+                with self._lock:
+                    connection = self._idle.pop() if self._idle else None
+                if connection is None:
+                    return connect()
+                if check is None or check(connection):
+                    return connection
+                with suppress(Exception):
+                    connection.close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, reusable=True):
+        """Возврат соединения в пул или его закрытие."""
+        try:
+            if reusable:
+                with self._lock:
+                    self._idle.append(connection)
+            else:
+                with suppress(Exception):
+                    connection.close()
+        finally:
+            self._slots.release()
+
+
+def get_pool(alias, size, timeout):
+    """Пул соединений базы alias в текущем процессе."""
+    if not size:
+        return None
+    key = (os.getpid(), alias)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(size, timeout)
+        return _pools[key]
+
+
+class PooledConnectionMixin:
+    """Проверка постоянных соединений и пул соединений для бэкенда Django."""
+
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        """Включена ли проверка переиспользуемых соединений."""
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool(self):
+        """Пул соединений или None, если пул не используется."""
+        return get_pool(
+            self.alias,
+            self.settings_dict.get('POOL_SIZE', 0),
+            self.settings_dict.get('POOL_TIMEOUT', 10),
+        )
+
+    def connect(self):
+        """
+        Подключение к базе.
+
+        Соединение из пула возвращается в конце запроса к API,
+        поэтому время его жизни у потока ограничено запросом.
+        """
+        super().connect()
+        self.health_check_done = True
+        if self.pool is not None:
+            self.close_at = time.monotonic()
+
+    def get_new_connection(self, conn_params):
+        """Соединение из пула или новое соединение."""
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection = pool.acquire(
+            partial(super().get_new_connection, conn_params),
+            self.check_connection if self.health_check_enabled else None,
+        )
+        if connection is None:
+            raise self.Database.OperationalError(
+                f'Нет свободных соединений в пуле {self.alias}.'
+            )
+        return connection
+
+    def check_connection(self, connection):
+        """Проверка соединения запросом SELECT 1."""
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        """Закрытие соединения или возврат его в пул."""
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        pool.release(self.connection, self.reset_connection(self.connection))
+
+    def reset_connection(self, connection):
+        """
+        Откат незавершённой транзакции перед возвратом в пул.
+
+        Соединение, закрытое внутри atomic, остаётся у обёртки Django,
+        а после ошибок может быть неисправным, поэтому в пул не попадает.
+        """
+        if self.errors_occurred or self.in_atomic_block:
+            return False
+        try:
+            connection.rollback()
+        except self.Database.Error:
+            return False
+        return True
+
+    def close_if_unusable_or_obsolete(self):
+        """Закрытие устаревшего соединения и сброс признака проверки."""
+        super().close_if_unusable_or_obsolete()
+        if self.connection is not None:
+            self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        """Закрытие соединения, не прошедшего проверку."""
+        if self.connection is None or self.health_check_done:
+            return
+        if not self.health_check_enabled:
+            return
+        if not self.check_connection(self.connection):
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        """Курсор на проверенном соединении."""
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+
+class DatabaseWrapper(PooledConnectionMixin, base.DatabaseWrapper):
+    """Бэкенд PostgreSQL с проверкой и пулом соединений."""
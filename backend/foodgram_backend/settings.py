@@ -54,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,17 +88,106 @@ WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Бэкенд foodgram_backend.db — PostgreSQL с проверкой и пулом соединений.
+# DB_CONN_MAX_AGE — время жизни постоянного соединения в секундах,
+# 0 — новое соединение на каждый запрос. С DB_CONN_HEALTH_CHECKS постоянное
+# соединение проверяется перед первым запросом к базе в каждом запросе к API.
+# С DB_POOL_SIZE больше 0 соединения процесса берутся из общего пула
+# на время запроса к API, ожидание свободного — не дольше DB_POOL_TIMEOUT
+# секунд. DB_CONNECT_TIMEOUT — время ожидания подключения к серверу.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'foodgram_backend.db',
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', 'True'
+        ) == 'True',
+        'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', 0)),
+        'POOL_TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+        },
+    }
+}
+
+# Реплики для чтения: DB_REPLICA_HOSTS — адреса серверов реплик через
+# запятую, остальные параметры подключения как у основной базы.
+# Просмотр рецептов, ингредиентов, тегов и подписок читает из реплик,
+# а пользователь после изменения данных DB_REPLICA_PIN_SECONDS секунд
+# читает из основной базы. Отметка хранится в кеше, поэтому при нескольких
+# процессах нужен общий кеш.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(','))
+):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# По умолчанию кеш в памяти процесса. При нескольких процессах нужен общий
+# кеш: через него процессы узнают об изменениях версий моделей, журнала
+# индекса подбора рецептов, отметок чтения из основной базы и токенов.
+# Можно указать Redis-совместимый бэкенд, например, с пакетом django-redis:
+# CACHE_BACKEND=django_redis.cache.RedisCache
+# CACHE_LOCATION=redis://redis:6379/1
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
+# Время хранения в кеше ответов API, представлений рецептов и связей
+# пользователей в секундах. Версии моделей хранятся без срока.
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 600))
+
+# Время в секундах, на которое клиенты и nginx могут кешировать ответы
+# со справочниками тегов и ингредиентов (Cache-Control: max-age)
+API_CACHE_MAX_AGE = int(os.getenv('API_CACHE_MAX_AGE', 60))
+
+# Кеш токенов аутентификации: время хранения в общем кеше и в памяти
+# процесса в секундах и количество токенов в памяти процесса. Удаление
+# токена и изменение пользователя сбрасывают кеш, в других процессах токен
+# из памяти действует не дольше API_TOKEN_CACHE_LOCAL_TIMEOUT секунд.
+API_TOKEN_CACHE_TIMEOUT = int(os.getenv('API_TOKEN_CACHE_TIMEOUT', 300))
+API_TOKEN_CACHE_LOCAL_TIMEOUT = int(
+    os.getenv('API_TOKEN_CACHE_LOCAL_TIMEOUT', 5)
+)
+API_TOKEN_CACHE_SIZE = int(os.getenv('API_TOKEN_CACHE_SIZE', 10000))
+
+# Асинхронный просмотр рецептов, тегов и ингредиентов под ASGI, включается
+# по умолчанию при запуске через foodgram_backend.asgi. Запросы к базе
+# и кешу выполняются в пуле из API_ASYNC_THREADS потоков, число потоков
+# ограничивает и число соединений процесса с базой.
+API_ASYNC_VIEWS = os.getenv('API_ASYNC_VIEWS', 'False') == 'True'
+API_ASYNC_THREADS = int(os.getenv('API_ASYNC_THREADS', 10))
+
+
+# Метрики и профилирование запросов
+# Доля запросов от 0 до 1, которые профилируются cProfile,
+# и директория для сохранения результатов профилирования.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_DIR = os.getenv('PROFILING_DIR', BASE_DIR / 'profiles')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -143,6 +233,30 @@ MEDIA_ROOT = '/app/media/'
 
 RECIPES_UPLOAD_TO =  'recipes/'
 
+# Миниатюры и копии изображений рецептов в WebP создаются в фоновых потоках,
+# при IMAGE_PROCESSING_WORKERS = 0 — сразу при сохранении рецепта.
+RECIPES_RENDITIONS_UPLOAD_TO = 'recipes/renditions/'
+RECIPES_THUMBNAIL_SIZE = (480, 480)
+RECIPES_IMAGE_MAX_SIZE = (1920, 1920)
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+
+# Популярность рецепта — взвешенная сумма добавлений в избранное и в списки
+# покупок. Популярность за последнее время учитывает добавления за
+# RECIPES_TRENDING_WINDOW_DAYS дней с затуханием вдвое каждые
+# RECIPES_TRENDING_HALF_LIFE_HOURS часов и пересчитывается командой
+# python manage.py rank_recipes
+RECIPES_FAVORITE_WEIGHT = 2
+RECIPES_CART_WEIGHT = 1
+RECIPES_TRENDING_WINDOW_DAYS = int(os.getenv('RECIPES_TRENDING_WINDOW_DAYS', 14))
+RECIPES_TRENDING_HALF_LIFE_HOURS = int(
+    os.getenv('RECIPES_TRENDING_HALF_LIFE_HOURS', 72)
+)
+
+# Для пользователей, подписанных не меньше чем на RECIPES_FEED_HOT_FOLLOWS
+# авторов, в кеше хранится начало ленты — RECIPES_FEED_HEAD_SIZE рецептов.
+RECIPES_FEED_HOT_FOLLOWS = int(os.getenv('RECIPES_FEED_HOT_FOLLOWS', 500))
+RECIPES_FEED_HEAD_SIZE = int(os.getenv('RECIPES_FEED_HEAD_SIZE', 100))
+
 
 # Путь и имя csv файла ингредиентов для загрузки с помощью команды управления
 # python manage.py load_ingredients
@@ -154,6 +268,10 @@ INGREDIENTS_CSV = BASE_DIR / 'data/ingredients.csv'
 # В одной строке один тег, его цвет и его слаг разделённые запятой.
 TAGS_CSV = BASE_DIR / 'data/tags.csv'
 
+# Максимальное количество ингредиентов в ответе на поиск по названию
+# /api/ingredients/?name=
+INGREDIENTS_SEARCH_LIMIT = int(os.getenv('INGREDIENTS_SEARCH_LIMIT', 50))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -170,10 +288,20 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageLimitPagination',
     'PAGE_SIZE': 6,
+    # JSON на orjson, без него — стандартные JSONRenderer и JSONParser.
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 DJOSER = {
@@ -30,9 +30,9 @@ class RecipeAdmin(admin.ModelAdmin):
     search_fields = ('name', 'author', 'text', 'tags',)
     empty_value_display = '-пусто-'
 
-    @admin.display(description='В избранном')
+    @admin.display(description='В избранном', ordering='favorites_count')
     def in_favorite(self, recipe):
-        return recipe.favoriterecipe.count()
+        return recipe.favorites_count
 
 
 class IngredientAmountAdmin(admin.ModelAdmin):
@@ -0,0 +1,84 @@
+"""
+Счётчики избранного, списков покупок, рецептов и подписчиков.
+
+Счётчики хранятся в полях моделей и изменяются атомарно выражениями F()
+при добавлении и удалении связей. Вместе со счётчиками избранного и списков
+покупок изменяется популярность рецепта. Расхождения, например, после
+изменений в админке, исправляет команда recount.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Subscription
+from .models import FavoriteRecipe, Recipe, ShoppingCartRecipe
+
+User = get_user_model()
+
+
+def change_counters(queryset, **deltas):
+    """Атомарное изменение счётчиков на заданные величины, не ниже нуля."""
+    return queryset.update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def change_favorites(recipe_ids, delta):
+    """Изменение счётчика избранного и популярности рецептов."""
+    return change_counters(
+        Recipe.objects.filter(pk__in=recipe_ids),
+        favorites_count=delta,
+        popularity=delta * settings.RECIPES_FAVORITE_WEIGHT,
+    )
+
+
+def change_cart(recipe_ids, delta):
+    """Изменение счётчика списков покупок и популярности рецептов."""
+    return change_counters(
+        Recipe.objects.filter(pk__in=recipe_ids),
+        cart_count=delta,
+        popularity=delta * settings.RECIPES_CART_WEIGHT,
+    )
+
+
+def change_followers(author_ids, delta):
+    """Изменение счётчика подписчиков авторов."""
+    return change_counters(
+        User.objects.filter(pk__in=author_ids), followers_count=delta
+    )
+
+
+def count_related(model, field):
+    """Подзапрос количества объектов model, ссылающихся на объект."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('pk')
+            ).values('count')
+        ),
+        0,
+    )
+
+
+def popularity():
+    """Выражение популярности рецепта по его счётчикам."""
+    favorites = F('favorites_count') * settings.RECIPES_FAVORITE_WEIGHT
+    cart = F('cart_count') * settings.RECIPES_CART_WEIGHT
+    return favorites + cart
+
+
+def recount():
+    """Пересчёт всех счётчиков по связям в базе."""
+    Recipe.objects.update(
+        favorites_count=count_related(FavoriteRecipe, 'recipe'),
+        cart_count=count_related(ShoppingCartRecipe, 'recipe'),
+    )
+    Recipe.objects.update(popularity=popularity())
+    User.objects.update(
+        recipes_count=count_related(Recipe, 'author'),
+        followers_count=count_related(Subscription, 'author'),
+    )
@@ -0,0 +1,148 @@
+"""
+Обработка изображений рецептов.
+
+После сохранения рецепта с новым изображением в фоновом потоке
+создаются миниатюра в JPEG и уменьшенная копия в WebP, которые отдаются
+в списках рецептов вместо исходного изображения.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    """
+    Пул потоков обработки изображений, создаётся при первом вызове.
+
+    Пул создаётся под блокировкой: при одновременных первых сохранениях
+    лишние пулы с потоками не создаются.
+    """
+    global _executor
+    if _executor is not None:
+        return _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSING_WORKERS,
+                thread_name_prefix='recipe-images',
+            )
+    return _executor
+
+
+def encode(image, size, format, **options):
+    """Уменьшенная копия изображения в указанном формате."""
+    image = image.copy()
+    image.thumbnail(size)
+    buffer = BytesIO()
+    image.save(buffer, format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def create_renditions(recipe_id):
+    """Создание миниатюры и копии в WebP для изображения рецепта."""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    image_name = recipe.image.name
+    with recipe.image.open('rb') as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        webp = encode(
+            image, settings.RECIPES_IMAGE_MAX_SIZE, 'WEBP', quality=80
+        )
+        thumbnail = encode(
+            image.convert('RGB'), settings.RECIPES_THUMBNAIL_SIZE, 'JPEG',
+            quality=85, optimize=True, progressive=True,
+        )
+
+    stem = Path(image_name).stem
+    recipe.image_webp.save(f'{stem}.webp', webp, save=False)
+    recipe.image_thumbnail.save(f'{stem}.jpg', thumbnail, save=False)
+    with transaction.atomic():
+        current = Recipe.objects.select_for_update().filter(
+            pk=recipe_id
+        ).values_list('image', flat=True).first()
+        if current == image_name:
+            recipe.save(update_fields=('image_webp', 'image_thumbnail'))
+            return
+    recipe.image_webp.delete(save=False)
+    recipe.image_thumbnail.delete(save=False)
+
+
+def try_create_renditions(recipe_id):
+    """
+    Создание копий изображения с записью ошибки в лог.
+
+    Изменение рецепта уже зафиксировано, поэтому ошибка обработки
+    изображения не должна приводить к ошибке запроса.
+    """
+    try:
+        create_renditions(recipe_id)
+    except Exception:
+        logger.exception(
+            'Ошибка обработки изображения рецепта %s', recipe_id
+        )
+
+
+def process_in_worker(recipe_id):
+    """Создание копий изображения в фоновом потоке."""
+    try:
+        try_create_renditions(recipe_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_renditions(recipe):
+    """
+    Запуск создания копий изображения после фиксации транзакции.
+
+    Если IMAGE_PROCESSING_WORKERS равно 0, копии создаются сразу
+    в текущем потоке.
+    """
+    recipe_id = recipe.pk
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        transaction.on_commit(lambda: try_create_renditions(recipe_id))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(process_in_worker, recipe_id)
+    )
+
+
+def delete_renditions(recipe):
+    """
+    Удаление копий прежнего изображения после фиксации транзакции.
+
+    Поля копий у рецепта очищаются сразу, а файлы удаляются только
+    после фиксации, чтобы при откате рецепт не ссылался на удалённые файлы.
+    """
+    renditions = [
+        (field.storage, field.name)
+        for field in (recipe.image_thumbnail, recipe.image_webp)
+        if field
+    ]
+    recipe.image_thumbnail = ''
+    recipe.image_webp = ''
+
+    def delete_files():
+        for storage, name in renditions:
+            try:
+                storage.delete(name)
+            except OSError:
+                logger.exception('Ошибка удаления файла %s', name)
+
+    transaction.on_commit(delete_files)
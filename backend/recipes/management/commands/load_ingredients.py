@@ -1,28 +1,76 @@
 """
-Загрузка ингредиентов из csv файл.
+Загрузка ингредиентов из csv или json файла.
 
-Путь и имя файла задаётся в setings.py в INGREDIENTS_CSV
-В одной строке один ингредиент и его мера измерения разделённые запятой.
+Путь и имя файла по умолчанию задаётся в setings.py в INGREDIENTS_CSV
+В одной строке csv один ингредиент и его мера измерения разделённые запятой.
+В json массив объектов с полями name и measurement_unit.
+Уже существующие ингредиенты пропускаются, поэтому загрузку можно повторять.
 """
-import csv
+import time
 
 from django.db import transaction
 from django.conf import settings
 from django.core.management import BaseCommand
 
+from ..loaders import batched, read_file
 from ...models import Ingredient
+from ...signals import bulk_loaded
 
 
 class Command(BaseCommand):
     """Класс команды управления Джанго."""
 
+    help = 'Загрузка ингредиентов из csv или json файла.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            'path', nargs='?', default=settings.INGREDIENTS_CSV,
+            help='Путь к csv или json файлу.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество ингредиентов в одном запросе.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать новые ингредиенты без загрузки.',
+        )
+
     @transaction.atomic
-    def handle(self, *args, **options):
+    def handle(self, *args, path, batch_size, dry_run, **options):
         """Код команды управления Джанго."""
-        with open(settings.INGREDIENTS_CSV, encoding='utf-8') as file:
-            data_csv = csv.reader(file)
-            for row in data_csv:
-                Ingredient.objects.get_or_create(
-                    name=row[0],
-                    measurement_unit=row[1],
-                )
+        start = time.monotonic()
+        created = existing = 0
+        rows = read_file(path, ('name', 'measurement_unit'))
+        for batch in batched(rows, batch_size):
+            ingredients = {
+                (row['name'], row['measurement_unit']) for row in batch
+            }
+            found = set(
+                Ingredient.objects.filter(
+                    name__in={name for name, _ in ingredients}
+                ).values_list('name', 'measurement_unit')
+            )
+            new = ingredients - found
+            created += len(new)
+            existing += len(ingredients) - len(new)
+            if dry_run:
+                for name, measurement_unit in sorted(new):
+                    self.stdout.write(f'+ {name}, {measurement_unit}')
+                continue
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in new
+                ],
+                ignore_conflicts=True,
+            )
+
+        if created and not dry_run:
+            bulk_loaded.send(sender=Ingredient)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Будет создано" if dry_run else "Создано"}: {created}, '
+            f'уже существует: {existing}, '
+            f'время: {time.monotonic() - start:.2f} с'
+        ))
@@ -1,29 +1,79 @@
 """
-Загрузка тегов из csv файл.
+Загрузка тегов из csv или json файла.
 
-Путь и имя файла задаётся в setings.py в TAGS_CSV
-В одной строке один тег, его цвет и его слаг разделённые запятой.
+Путь и имя файла по умолчанию задаётся в setings.py в TAGS_CSV
+В одной строке csv один тег, его цвет и его слаг разделённые запятой.
+В json массив объектов с полями name, color и slug.
+Теги сопоставляются по слагу: новые создаются, у существующих
+обновляются название и цвет.
 """
-import csv
+import time
 
 from django.db import transaction
 from django.conf import settings
 from django.core.management import BaseCommand
 
+from ..loaders import batched, read_file
 from ...models import Tag
+from ...signals import bulk_loaded
 
 
 class Command(BaseCommand):
     """Класс команды управления Джанго."""
 
+    help = 'Загрузка тегов из csv или json файла.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            'path', nargs='?', default=settings.TAGS_CSV,
+            help='Путь к csv или json файлу.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество тегов в одном запросе.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать изменения без загрузки.',
+        )
+
     @transaction.atomic
-    def handle(self, *args, **options):
+    def handle(self, *args, path, batch_size, dry_run, **options):
         """Код команды управления Джанго."""
-        with open(settings.TAGS_CSV, encoding='utf-8') as file:
-            data_csv = csv.reader(file)
-            for row in data_csv:
-                Tag.objects.get_or_create(
-                    name=row[0],
-                    color=row[1],
-                    slug=row[2],
-                )
+        start = time.monotonic()
+        created = updated = unchanged = 0
+        rows = read_file(path, ('name', 'color', 'slug'))
+        for batch in batched(rows, batch_size):
+            tags = {row['slug']: row for row in batch}
+            found = Tag.objects.in_bulk(tags, field_name='slug')
+            new_tags = []
+            changed_tags = []
+            for slug, row in tags.items():
+                tag = found.get(slug)
+                if tag is None:
+                    new_tags.append(Tag(**row))
+                    if dry_run:
+                        self.stdout.write(f'+ {slug}: {row["name"]}')
+                elif (tag.name, tag.color) != (row['name'], row['color']):
+                    tag.name = row['name']
+                    tag.color = row['color']
+                    changed_tags.append(tag)
+                    if dry_run:
+                        self.stdout.write(f'~ {slug}: {row["name"]}')
+            created += len(new_tags)
+            updated += len(changed_tags)
+            unchanged += len(tags) - len(new_tags) - len(changed_tags)
+            if dry_run:
+                continue
+            Tag.objects.bulk_create(new_tags, ignore_conflicts=True)
+            Tag.objects.bulk_update(changed_tags, ('name', 'color'))
+
+        if (created or updated) and not dry_run:
+            bulk_loaded.send(sender=Tag)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Будет создано" if dry_run else "Создано"}: {created}, '
+            f'{"будет обновлено" if dry_run else "обновлено"}: {updated}, '
+            f'без изменений: {unchanged}, '
+            f'время: {time.monotonic() - start:.2f} с'
+        ))
@@ -0,0 +1,37 @@
+"""
+Пересчёт популярности рецептов за последнее время.
+
+Популярность за последнее время со временем затухает, поэтому команду
+нужно запускать периодически, например, из cron раз в час.
+Общая популярность изменяется сразу при добавлении в избранное и
+в списки покупок и пересчитывается командой recount.
+"""
+import time
+
+from django.db import transaction
+from django.core.management import BaseCommand
+
+from ...ranking import update_trending
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'Пересчёт популярности рецептов за последнее время.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество рецептов в одном запросе.',
+        )
+
+    @transaction.atomic
+    def handle(self, *args, batch_size, **options):
+        """Код команды управления Джанго."""
+        start = time.monotonic()
+        updated = update_trending(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {updated}, '
+            f'время: {time.monotonic() - start:.2f} с'
+        ))
@@ -0,0 +1,23 @@
+"""
+Пересчёт счётчиков.
+
+Количество добавлений рецептов в избранное и в списки покупок,
+количество рецептов и подписчиков пользователей пересчитываются
+по связям в базе.
+"""
+from django.db import transaction
+from django.core.management import BaseCommand
+
+from ...counters import recount
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'Пересчёт счётчиков избранного, покупок, рецептов и подписчиков.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        """Код команды управления Джанго."""
+        recount()
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
@@ -0,0 +1,232 @@
+"""
+Заполнение базы синтетическими данными для нагрузочного тестирования.
+
+Создаются пользователи, рецепты с тегами и ингредиентами, избранное,
+списки покупок и подписки. Авторы, рецепты и ингредиенты выбираются
+с неравномерным распределением (закон Ципфа): у немногих авторов много
+рецептов и подписчиков, немногие рецепты часто попадают в избранное.
+Пароль всех созданных пользователей — benchmark.
+"""
+import random
+import time
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, call_command
+from django.db import transaction
+from django.db.models import Max
+
+from users.models import Subscription
+from ...counters import recount
+from ...models import (FavoriteRecipe, Ingredient, IngredientAmount, Recipe,
+                       ShoppingCartRecipe, Tag)
+from ...ranking import update_trending
+from ...search import update_search_vectors
+from ...signals import bulk_loaded
+
+User = get_user_model()
+
+PASSWORD = 'benchmark'
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'Заполнение базы синтетическими данными.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients', type=int, default=8,
+            help='Наибольшее количество ингредиентов в рецепте.',
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее количество избранных рецептов у пользователя.',
+        )
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Среднее количество рецептов в списке покупок.',
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='Среднее количество подписок у пользователя.',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='Показатель распределения Ципфа, 0 — равномерное.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        """Код команды управления Джанго."""
+        start = time.monotonic()
+        self.random = random.Random(options['seed'])
+        self.skew = options['skew']
+        self.batch_size = options['batch_size']
+
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', stdout=self.stdout)
+        if not Tag.objects.exists():
+            call_command('load_tags', stdout=self.stdout)
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        self.random.shuffle(ingredient_ids)
+
+        user_ids = self.create_users(options['users'])
+        self.random.shuffle(user_ids)
+        recipe_ids = self.create_recipes(
+            options['recipes'], user_ids, tag_ids, ingredient_ids,
+            options['ingredients'],
+        )
+        self.random.shuffle(recipe_ids)
+
+        self.create_relations(
+            FavoriteRecipe, 'recipe_id', user_ids, recipe_ids,
+            options['favorites'],
+        )
+        self.create_relations(
+            ShoppingCartRecipe, 'recipe_id', user_ids, recipe_ids,
+            options['carts'],
+        )
+        self.create_relations(
+            Subscription, 'author_id', user_ids, user_ids,
+            options['subscriptions'],
+        )
+        recount()
+        update_trending(self.batch_size)
+        update_search_vectors(Recipe.objects.all())
+
+        for model in (User, Recipe, IngredientAmount, FavoriteRecipe,
+                      ShoppingCartRecipe, Subscription):
+            bulk_loaded.send(sender=model)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - start:.2f} с'
+        ))
+
+    def choose(self, population, cum_weights, k):
+        """Выбор k элементов с распределением Ципфа."""
+        return self.random.choices(population, cum_weights=cum_weights, k=k)
+
+    def cum_weights(self, size):
+        """Накопленные веса распределения Ципфа для size элементов."""
+        return list(accumulate(
+            1 / (rank ** self.skew) for rank in range(1, size + 1)
+        ))
+
+    def bulk_create(self, model, objects):
+        """Массовое создание объектов с возвратом их id."""
+        last_id = model.objects.aggregate(Max('id'))['id__max'] or 0
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        return list(
+            model.objects.filter(id__gt=last_id).values_list('id', flat=True)
+        )
+
+    def log(self, model, count):
+        """Вывод количества созданных объектов."""
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {count}')
+
+    def create_users(self, count):
+        """Создание пользователей."""
+        number = (User.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        password = make_password(PASSWORD)
+        user_ids = []
+        for offset in range(0, count, self.batch_size):
+            user_ids += self.bulk_create(User, [
+                User(
+                    email=f'benchmark{number + index}@example.com',
+                    username=f'benchmark{number + index}',
+                    first_name='Имя',
+                    last_name='Фамилия',
+                    password=password,
+                )
+                for index in range(
+                    offset, min(offset + self.batch_size, count)
+                )
+            ])
+        self.log(User, len(user_ids))
+        return user_ids
+
+    def create_recipes(self, count, user_ids, tag_ids, ingredient_ids,
+                       max_ingredients):
+        """Создание рецептов с тегами и ингредиентами."""
+        author_weights = self.cum_weights(len(user_ids))
+        ingredient_weights = self.cum_weights(len(ingredient_ids))
+        recipe_ids = []
+        amounts_count = 0
+        for offset in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - offset)
+            authors = self.choose(user_ids, author_weights, size)
+            batch_ids = self.bulk_create(Recipe, [
+                Recipe(
+                    author_id=author_id,
+                    name=f'Рецепт {offset + index + 1}',
+                    text='Описание рецепта для нагрузочного тестирования.',
+                    cooking_time=self.random.randint(1, 180),
+                    image=f'{settings.RECIPES_UPLOAD_TO}benchmark.png',
+                )
+                for index, author_id in enumerate(authors)
+            ])
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in batch_ids
+                for tag_id in self.random.sample(
+                    tag_ids, self.random.randint(1, min(3, len(tag_ids)))
+                )
+            ], batch_size=self.batch_size)
+            amounts = [
+                IngredientAmount(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, 500),
+                )
+                for recipe_id in batch_ids
+                for ingredient_id in set(self.choose(
+                    ingredient_ids, ingredient_weights,
+                    self.random.randint(1, max_ingredients),
+                ))
+            ]
+            IngredientAmount.objects.bulk_create(
+                amounts, batch_size=self.batch_size
+            )
+            amounts_count += len(amounts)
+            recipe_ids += batch_ids
+        self.log(Recipe, len(recipe_ids))
+        self.log(IngredientAmount, amounts_count)
+        return recipe_ids
+
+    def create_relations(self, model, field, user_ids, target_ids, average):
+        """
+        Создание связей пользователей с рецептами или авторами.
+
+        Количество связей у пользователя распределено экспоненциально
+        со средним average, популярность целей — по закону Ципфа.
+        """
+        if not average or not target_ids:
+            return
+        weights = self.cum_weights(len(target_ids))
+        objects = []
+        created = 0
+        for user_id in user_ids:
+            size = min(
+                int(self.random.expovariate(1 / average)), len(target_ids)
+            )
+            targets = set(self.choose(target_ids, weights, size))
+            if model is Subscription:
+                targets.discard(user_id)
+            objects += [
+                model(user_id=user_id, **{field: target_id})
+                for target_id in targets
+            ]
+            if len(objects) >= self.batch_size:
+                model.objects.bulk_create(objects, ignore_conflicts=True)
+                created += len(objects)
+                objects = []
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+        self.log(model, created + len(objects))
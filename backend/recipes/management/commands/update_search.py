@@ -0,0 +1,45 @@
+"""
+Обновление поисковых векторов рецептов.
+
+Векторы обновляются сами после сохранения рецептов и ингредиентов,
+команда нужна после массовой загрузки данных и изменений в обход моделей.
+Работает только с PostgreSQL.
+"""
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Max
+
+from ...models import Recipe
+from ...search import is_supported, update_search_vectors
+
+
+class Command(BaseCommand):
+    """Класс команды управления Джанго."""
+
+    help = 'Обновление поисковых векторов рецептов.'
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество рецептов в одном запросе.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        """Код команды управления Джанго."""
+        if not is_supported(Recipe.objects.all()):
+            raise CommandError('Полнотекстовый поиск требует PostgreSQL.')
+        start = time.monotonic()
+        last_id = Recipe.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        updated = 0
+        for first_id in range(1, last_id + 1, batch_size):
+            updated += update_search_vectors(
+                Recipe.objects.filter(
+                    id__gte=first_id, id__lt=first_id + batch_size
+                )
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {updated}, '
+            f'время: {time.monotonic() - start:.2f} с'
+        ))
@@ -0,0 +1,56 @@
+"""Общий код команд загрузки данных из csv и json файлов."""
+import csv
+import json
+from itertools import islice
+
+from django.core.management import CommandError
+
+
+def read_csv(path, fields):
+    """Построчное чтение csv файла в словари с указанными полями."""
+    with open(path, encoding='utf-8') as file:
+        for row in csv.reader(file):
+            yield dict(zip(fields, row))
+
+
+def read_json(path, chunk_size=64 * 1024):
+    """Потоковое чтение json файла с массивом объектов."""
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as file:
+        buffer = file.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise CommandError(f'{path}: ожидается массив объектов.')
+        buffer = buffer[1:]
+        end_of_file = False
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if end_of_file:
+                    raise CommandError(f'{path}: некорректный json.')
+                chunk = file.read(chunk_size)
+                end_of_file = not chunk
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def read_file(path, fields):
+    """Чтение csv или json файла в зависимости от расширения."""
+    if str(path).endswith('.json'):
+        return read_json(path)
+    return read_csv(path, fields)
+
+
+def batched(iterable, batch_size):
+    """Разбиение на пачки по batch_size элементов."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
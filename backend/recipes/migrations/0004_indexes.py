@@ -0,0 +1,65 @@
+# Generated by Django 3.2.21 on 2026-10-18 19:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+INGREDIENT_NAME_INDEX = 'recipes_ingredient_name_upper_idx'
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    """
+    Индекс для поиска ингредиента по началу названия без учёта регистра.
+
+    Фильтр istartswith в PostgreSQL выполняется как
+    UPPER(name::text) LIKE UPPER('...%'), для такого условия нужен индекс
+    по выражению с классом операторов text_pattern_ops.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INGREDIENT_NAME_INDEX} '
+        'ON recipes_ingredient (UPPER(name::text) text_pattern_ops)'
+    )
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    """Удаление индекса по началу названия ингредиента."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INGREDIENT_NAME_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_auto_20231011_2212'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-id'], name='recipes_recipe_author_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='favoriterecipe',
+            index=models.Index(fields=['recipe', 'user'], name='recipes_favorite_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcartrecipe',
+            index=models.Index(fields=['recipe', 'user'], name='recipes_cart_recipe_idx'),
+        ),
+        migrations.AlterField(
+            model_name='favoriterecipe',
+            name='recipe',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='favoriterecipe', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='shoppingcartrecipe',
+            name='recipe',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='shoppingcartrecipe', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.RunPython(
+            create_ingredient_name_index,
+            drop_ingredient_name_index,
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.21 on 2026-10-18 20:41
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import F
+
+# Время добавления существующих записей неизвестно. Они получают давнюю
+# дату, чтобы не попасть в окно популярности за последнее время как новые.
+ADDED_BEFORE_RANKING = datetime.datetime(
+    1970, 1, 1, tzinfo=datetime.timezone.utc
+)
+
+
+def fill_popularity(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.update(
+        popularity=F('favorites_count') * 2 + F('cart_count')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favoriterecipe',
+            name='added',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=ADDED_BEFORE_RANKING, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='popularity',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность за последнее время'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcartrecipe',
+            name='added',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=ADDED_BEFORE_RANKING, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-popularity', '-id'], name='recipes_recipe_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending', '-id'], name='recipes_recipe_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time', '-id'], name='recipes_recipe_cooking_idx'),
+        ),
+        migrations.RunPython(fill_popularity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2.21 on 2026-10-18 20:05
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_INDEX = 'recipes_recipe_search_vector_idx'
+
+
+def create_search_vector_index(apps, schema_editor):
+    """
+    GIN-индекс поискового вектора и заполнение вектора у рецептов.
+
+    GIN-индекс есть только в PostgreSQL, поэтому создаётся не в Meta модели.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {SEARCH_VECTOR_INDEX} '
+        'ON recipes_recipe USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        "UPDATE recipes_recipe r SET search_vector = "
+        "setweight(to_tsvector('russian', coalesce(r.name, '')), 'A') || "
+        "setweight(to_tsvector('russian', coalesce(("
+        "SELECT string_agg(i.name, ' ') FROM recipes_ingredientamount a "
+        "JOIN recipes_ingredient i ON i.id = a.ingredient_id "
+        "WHERE a.recipe_id = r.id), '')), 'B') || "
+        "setweight(to_tsvector('russian', coalesce(r.text, '')), 'C')"
+    )
+
+
+def drop_search_vector_index(apps, schema_editor):
+    """Удаление GIN-индекса поискового вектора."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {SEARCH_VECTOR_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_ranking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            create_search_vector_index,
+            drop_search_vector_index,
+        ),
+    ]
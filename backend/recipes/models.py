@@ -1,9 +1,11 @@
 """Модели приложения Рецепты."""
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
 from django.db import models
+from django.db.models import Prefetch
 
 User = get_user_model()
 
@@ -82,6 +84,29 @@ class Ingredient(models.Model):
         ordering = ['name']
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов рецепта."""
+
+    def with_related(self):
+        """
+        Рецепты со всеми данными для просмотра.
+
+        Теги, автор и ингредиенты подгружаются заранее. Поисковый вектор
+        для просмотра не нужен и не загружается. Статусы избранного,
+        списка покупок и подписки на автора зависят от пользователя
+        и определяются по кешу его связей.
+        """
+        return self.defer('search_vector').select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredientamount',
+                queryset=IngredientAmount.objects.select_related('ingredient'),
+            ),
+        )
+
+
 class Recipe(models.Model):
     """Модель рецепта."""
 
@@ -94,6 +119,7 @@ class Recipe(models.Model):
         on_delete=models.CASCADE,
         related_name='recipe',
         verbose_name='Автор',
+        db_index=False,
     )
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -109,7 +135,44 @@ class Recipe(models.Model):
         verbose_name='Изображение',
         upload_to=settings.RECIPES_UPLOAD_TO,
     )
+    image_thumbnail = models.ImageField(
+        verbose_name='Миниатюра изображения',
+        upload_to=settings.RECIPES_RENDITIONS_UPLOAD_TO,
+        blank=True,
+        editable=False,
+    )
+    image_webp = models.ImageField(
+        verbose_name='Изображение в WebP',
+        upload_to=settings.RECIPES_RENDITIONS_UPLOAD_TO,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(verbose_name='Описание')
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном',
+    )
+    cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок',
+    )
+    popularity = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Популярность',
+    )
+    trending = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Популярность за последнее время',
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор',
+    )
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления (в минутах)',
         validators=[
@@ -118,6 +181,8 @@ class Recipe(models.Model):
         ],
     )
 
+    objects = RecipeQuerySet.as_manager()
+
     def __str__(self):
         """Строковое представление модели рецепта."""
         return f'{self.name} от {self.author}'
@@ -125,6 +190,24 @@ class Recipe(models.Model):
     class Meta:
         """Метаданные модели Рецепта."""
 
+        indexes = [
+            models.Index(
+                fields=['author', '-id'],
+                name='recipes_recipe_author_id_idx'
+            ),
+            models.Index(
+                fields=['-popularity', '-id'],
+                name='recipes_recipe_popularity_idx'
+            ),
+            models.Index(
+                fields=['-trending', '-id'],
+                name='recipes_recipe_trending_idx'
+            ),
+            models.Index(
+                fields=['cooking_time', '-id'],
+                name='recipes_recipe_cooking_idx'
+            ),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-id']
@@ -186,7 +269,13 @@ class FavoriteRecipe(models.Model):
         Recipe,
         on_delete=models.CASCADE,
         related_name='favoriterecipe',
-        verbose_name='Рецепт'
+        verbose_name='Рецепт',
+        db_index=False,
+    )
+    added = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления',
     )
 
     def __str__(self):
@@ -202,6 +291,12 @@ class FavoriteRecipe(models.Model):
                 name='%(app_label)s_%(class)s_user_recipe_pair_unique'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='recipes_favorite_recipe_idx'
+            ),
+        ]
         verbose_name = 'Избранные рецепты пользователя'
         verbose_name_plural = 'Избранные рецепты пользователей'
         ordering = ['user']
@@ -220,7 +315,13 @@ class ShoppingCartRecipe(models.Model):
         Recipe,
         on_delete=models.CASCADE,
         related_name='shoppingcartrecipe',
-        verbose_name='Рецепт'
+        verbose_name='Рецепт',
+        db_index=False,
+    )
+    added = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления',
     )
 
     def __str__(self):
@@ -236,6 +337,12 @@ class ShoppingCartRecipe(models.Model):
                 name='%(app_label)s_%(class)s_user_recipe_pair_unique'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='recipes_cart_recipe_idx'
+            ),
+        ]
         verbose_name = 'Список покупок пользователя'
         verbose_name_plural = 'Списки покупок пользователей'
         ordering = ['user']
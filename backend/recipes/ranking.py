@@ -0,0 +1,66 @@
+"""
+Популярность рецептов за последнее время.
+
+Каждое добавление рецепта в избранное или в список покупок за последние
+RECIPES_TRENDING_WINDOW_DAYS дней даёт вклад, равный весу добавления,
+который уменьшается вдвое каждые RECIPES_TRENDING_HALF_LIFE_HOURS часов.
+Добавления группируются в базе по рецепту и часу, поэтому объём работы
+зависит от активности за окно, а не от общего количества рецептов.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .management.loaders import batched
+from .models import FavoriteRecipe, Recipe, ShoppingCartRecipe
+
+
+def trending_scores(now):
+    """Популярность рецептов, добавленных куда-либо за окно."""
+    since = now - timedelta(days=settings.RECIPES_TRENDING_WINDOW_DAYS)
+    half_life = timedelta(hours=settings.RECIPES_TRENDING_HALF_LIFE_HOURS)
+    scores = defaultdict(float)
+    for model, weight in (
+        (FavoriteRecipe, settings.RECIPES_FAVORITE_WEIGHT),
+        (ShoppingCartRecipe, settings.RECIPES_CART_WEIGHT),
+    ):
+        added = model.objects.filter(
+            added__gte=since
+        ).annotate(
+            hour=TruncHour('added')
+        ).order_by().values('recipe_id', 'hour').annotate(
+            count=Count('pk')
+        ).values_list('recipe_id', 'hour', 'count')
+        for recipe_id, hour, count in added.iterator():
+            age = max(now - hour, timedelta()) / half_life
+            scores[recipe_id] += weight * count * 0.5 ** age
+    return scores
+
+
+def update_trending(batch_size=1000, now=None):
+    """
+    Пересчёт популярности рецептов за последнее время.
+
+    Обновляются только рецепты с добавлениями за окно и рецепты,
+    популярность которых ещё не обнулена. Возвращает количество
+    обновлённых рецептов.
+    """
+    scores = trending_scores(now or timezone.now())
+    stale = set(
+        Recipe.objects.filter(trending__gt=0).values_list('id', flat=True)
+    ).difference(scores)
+    for ids in batched(stale, batch_size):
+        Recipe.objects.filter(id__in=ids).update(trending=0)
+    Recipe.objects.bulk_update(
+        [
+            Recipe(id=recipe_id, trending=round(score, 6))
+            for recipe_id, score in scores.items()
+        ],
+        ('trending',),
+        batch_size=batch_size,
+    )
+    return len(stale) + len(scores)
@@ -0,0 +1,108 @@
+"""
+Полнотекстовый поиск рецептов.
+
+В PostgreSQL рецепты ищутся по хранимому полю search_vector с GIN-индексом.
+Название рецепта имеет вес A, названия ингредиентов — B, описание — C,
+слова приводятся к основе по правилам русского языка. Поле обновляется
+после сохранения рецепта или ингредиента, полностью — командой
+update_search. В других СУБД рецепты ищутся по подстроке без учёта
+регистра.
+"""
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchHeadline, SearchQuery,
+                                            SearchRank, SearchVector)
+from django.db import connections
+from django.db.models import Exists, F, OuterRef, Q, Subquery
+
+from .models import IngredientAmount, Recipe
+
+SEARCH_CONFIG = 'russian'
+
+
+def is_supported(queryset):
+    """Поддерживает ли база запроса полнотекстовый поиск."""
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def search_vector():
+    """Выражение поискового вектора рецепта."""
+    ingredient_names = Subquery(
+        IngredientAmount.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+    )
+    name = SearchVector('name', weight='A', config=SEARCH_CONFIG)
+    ingredients = SearchVector(
+        ingredient_names, weight='B', config=SEARCH_CONFIG
+    )
+    text = SearchVector('text', weight='C', config=SEARCH_CONFIG)
+    return name + ingredients + text
+
+
+def update_search_vectors(queryset):
+    """Обновление поисковых векторов рецептов из queryset."""
+    if not is_supported(queryset):
+        return 0
+    return queryset.update(search_vector=search_vector())
+
+
+def search_recipes_naive(queryset, text):
+    """Поиск рецептов по подстроке в названии, описании и ингредиентах."""
+    in_ingredients = Exists(
+        IngredientAmount.objects.filter(
+            recipe=OuterRef('pk'), ingredient__name__icontains=text
+        )
+    )
+    return queryset.filter(
+        Q(name__icontains=text) | Q(text__icontains=text) | in_ingredients
+    )
+
+
+def search_query(text):
+    """Полнотекстовый запрос по тексту запроса пользователя."""
+    return SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+
+
+def search_recipes(queryset, text):
+    """
+    Поиск рецептов по тексту запроса.
+
+    Найденные полнотекстовым поиском рецепты аннотируются релевантностью
+    search_rank. Фрагменты описания добавляет add_headlines только
+    рецептам страницы: аннотации остаются в подзапросе COUNT пагинатора,
+    и ts_headline выполнялся бы для всех найденных рецептов.
+    """
+    if not is_supported(queryset):
+        return search_recipes_naive(queryset, text)
+    query = search_query(text)
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=SearchRank(F('search_vector'), query),
+    )
+
+
+def add_headlines(recipes, text):
+    """
+    Фрагменты описания search_headline с выделенными словами запроса.
+
+    Фрагменты вычисляются одним запросом для рецептов recipes
+    и записываются в их атрибут search_headline.
+    """
+    recipes = list(recipes)
+    if not recipes or not is_supported(Recipe.objects.all()):
+        return recipes
+    headlines = dict(
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes]
+        ).annotate(
+            search_headline=SearchHeadline(
+                'text', search_query(text), config=SEARCH_CONFIG,
+                start_sel='<mark>', stop_sel='</mark>', max_fragments=2,
+            ),
+        ).values_list('pk', 'search_headline')
+    )
+    for recipe in recipes:
+        if recipe.pk in headlines:
+            recipe.search_headline = headlines[recipe.pk]
+    return recipes
@@ -0,0 +1,42 @@
+"""Сигналы приложения Рецепты."""
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+
+from .models import Ingredient, Recipe
+from .search import update_search_vectors
+
+# Отправляется после массовой загрузки объектов без сигналов post_save,
+# sender — модель загруженных объектов.
+bulk_loaded = Signal()
+
+SEARCH_FIELDS = {'name', 'text'}
+
+
+def update_recipe_search(sender, instance, update_fields, **kwargs):
+    """
+    Обновление поискового вектора рецепта после транзакции.
+
+    Вектор строится после транзакции, когда ингредиенты
+    рецепта уже сохранены.
+    """
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    transaction.on_commit(
+        lambda: update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+    )
+
+
+def update_ingredient_search(sender, instance, created, **kwargs):
+    """Обновление поисковых векторов рецептов с изменённым ингредиентом."""
+    if created:
+        return
+    transaction.on_commit(
+        lambda: update_search_vectors(
+            Recipe.objects.filter(ingredients=instance)
+        )
+    )
+
+
+post_save.connect(update_recipe_search, sender=Recipe)
+post_save.connect(update_ingredient_search, sender=Ingredient)
@@ -36,6 +36,18 @@ class CustomUser(AbstractUser):
         blank=False,
     )
 
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов',
+    )
+
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков',
+    )
+
     def __str__(self):
         """Строковое представление модели пользователя."""
         return self.email